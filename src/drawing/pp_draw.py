@@ -1,6 +1,6 @@
 from src.drawing import stddraw
 from src.entities.uav_entities import Environment
-from src.utilities import config, utilities
+from src.utilities import config
 from collections import defaultdict
 
 #printer the environment 
@@ -57,9 +57,9 @@ class PathPlanningDrawer():
             stddraw.line(0, j, self.width, j)
             self.__reset_pen()
 
-        for cell, cell_center in utilities.TraversedCells.all_centers(self.width, self.height, self.simulator.prob_size_cell):
-            index_cell = int(cell[0])
-            pr = self.simulator.cell_prob_map[index_cell][2]
+        probabilities = self.simulator.cell_prob_map.probabilities()
+        for index_cell, cell_center in enumerate(self.simulator.cell_grid.centers()):
+            pr = probabilities[index_cell]
             stddraw.text(cell_center[0], cell_center[1], "pr-c: " + str(round(pr, 4)))
 
     def __reset_pen(self):
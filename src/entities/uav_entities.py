@@ -6,6 +6,8 @@ class SimulatedEntity:
     of the simulation. No class of this type is directly instantiable.
     """
 
+    __slots__ = ("simulator",)
+
     def __init__(self, simulator):
         self.simulator = simulator
 
@@ -13,14 +15,16 @@ class SimulatedEntity:
 class Entity(SimulatedEntity):
     """ An entity in the environment, e.g. Drone, Event, Packet. It extends SimulatedEntity. """
 
+    __slots__ = ("identifier", "coords")
+
     def __init__(self, identifier: int, coords: tuple, simulator):
         super().__init__(simulator)
         self.identifier = identifier  # the id of the entity
         self.coords = coords  # the coordinates of the entity on the map
 
     def __eq__(self, other):
-        """ Entity objects are identified by their id. """
-        if not isinstance(other, Entity):
+        """ Entity objects of the same kind are identified by their id. """
+        if type(other) is not type(self):
             return False
         else:
             return other.identifier == self.identifier
@@ -33,8 +37,12 @@ class Entity(SimulatedEntity):
 class Event(Entity):
     """ An event is any kind of event that the drone detects on the aoi. It is an Entity. """
 
+    __slots__ = ("current_time", "deadline")
+
     def __init__(self, coords: tuple, current_time: int, simulator, deadline=None):
-        super().__init__(id(self), coords, simulator)
+        # events that do not belong to a simulation (i.e., CONTROL_EVENT) have no identifier
+        identifier = simulator.new_identifier("event") if simulator is not None else -1
+        super().__init__(identifier, coords, simulator)
         self.current_time = current_time
 
         # One can specify the deadline or just consider as deadline now + EVENTS_DURATION
@@ -75,20 +83,25 @@ class Event(Entity):
         return "Ev id:" + str(self.identifier) + " c:" + str(self.coords)
 
 
+# the event shared by all the control packets, they are not associated to any event
+CONTROL_EVENT = Event((-1, -1), -1, None, deadline=-1)
+
+
 # ------------------ Packet ----------------------
 class Packet(Entity):
     """ A packet is an object created out of an event monitored on the aoi. """
 
+    __slots__ = ("time_step_creation", "event_ref", "__TTL", "__max_TTL", "number_retransmission_attempt",
+                 "hops", "last_2_hops", "optional_data", "time_delivery", "is_move_packet")
+
     def __init__(self, time_step_creation, simulator, event_ref: Event = None):
         """ the event associated to the packet, time step in which the packet was created
          as for now, every packet is an event. """
 
-        event_ref_crafted = event_ref if event_ref is not None else Event((-1, -1), -1,
-                                                                          simulator)  # default event if packet is not associated to the event
+        event_ref_crafted = event_ref if event_ref is not None else CONTROL_EVENT  # default event if packet is not associated to the event
 
-        # id(self) is the id of this instance (unique for every new created packet),
-        # the coordinates are those of the event
-        super().__init__(id(self), event_ref_crafted.coords, simulator)
+        # the id is unique for every new created packet, the coordinates are those of the event
+        super().__init__(simulator.new_identifier("packet"), event_ref_crafted.coords, simulator)
 
         self.time_step_creation = time_step_creation
         self.event_ref = event_ref_crafted
@@ -96,11 +109,11 @@ class Packet(Entity):
         self.__max_TTL = self.simulator.packets_max_ttl
         self.number_retransmission_attempt = 0
 
-        self.hops = set()  # All the drones that have received/transmitted the packets
-        self.last_2_hops = []
+        self.hops = 0  # All the drones that have received/transmitted the packets, bit i is set for the drone with identifier i
+        self.last_2_hops = (None, None)  # the second last and the last hop
         # add metrics: all the packets generated by the drones, either delivered or not (union of all the buffers)
         if event_ref is not None:
-            self.add = self.simulator.metrics.drones_packets.add(self)
+            self.simulator.metrics.drones_packets.add(self)
 
         self.optional_data = None  # list
         self.time_delivery = None
@@ -127,14 +140,15 @@ class Packet(Entity):
     def add_hop(self, drone):
         """ add a new hop in the packet """
 
-        if len(self.last_2_hops) == 2:
-            self.last_2_hops = self.last_2_hops[1:]  # keep just the last two HOPS
-        self.last_2_hops.append(drone)
-        self.hops.add(drone)
+        self.last_2_hops = (self.last_2_hops[1], drone)  # keep just the last two HOPS
+        self.hops |= 1 << drone.identifier
 
-        # self.hops.add(drone.identifier)
         self.increase_TTL_hops()
 
+    def has_hop(self, drone):
+        """ return true if the drone has already received/transmitted the packet """
+        return (self.hops >> drone.identifier) & 1 == 1
+
     def increase_TTL_hops(self):
         self.__TTL += 1
 
@@ -158,6 +172,8 @@ class Packet(Entity):
 class DataPacket(Packet):
     """ Basically a Packet"""
 
+    __slots__ = ("time_of_data_forwarding", "queue_time")
+
     # when packet is generated time_of_data_forwarding is 0
     # when packet is generated queue_time is 0
     def __init__(self, time_step_creation, simulator, event_ref: Event = None):
@@ -165,11 +181,33 @@ class DataPacket(Packet):
         self.time_of_data_forwarding = 0 # time-step at which the DataPacket was sent by node_x
         self.queue_time = 0 # time the packet spent in the queue before being sent.
 
+class ControlPacket:
+    """ A control packet carries routing information between drones (hello, ACK and estimation messages).
+    Control packets are lightweight: they are not associated to any event and do not keep track of their hops. """
+
+    __slots__ = ("identifier", "time_step_creation", "simulator")
+
+    event_ref = CONTROL_EVENT
+    coords = CONTROL_EVENT.coords
+
+    def __init__(self, time_step_creation, simulator):
+        # control packets that do not belong to a simulation have no identifier, as CONTROL_EVENT
+        self.identifier = simulator.new_identifier("control") if simulator is not None else -1
+        self.time_step_creation = time_step_creation
+        self.simulator = simulator
+
+    def __repr__(self):
+        return self.__class__.__name__ + "id:" + str(self.identifier)
+
 # the ACKPacket object contains also the queue_time of the associated DataPacket. It is done this way to avoid initializing and maintaining a data sctructure for each drone that keeps track of the
 # sent packets and their queue_time
-class ACKPacket(Packet):
+class ACKPacket(ControlPacket):
+
+    __slots__ = ("acked_packet", "time_of_data_reception", "time_of_data_forwarding", "queue_time",
+                 "estimate_time_to_depot_y", "src_drone", "dst_drone")
+
     def __init__(self, src_drone, dst_drone, time_of_data_reception, time_of_data_forwarding, queue_time, estimate_time_to_depot_y, simulator, acked_packet, time_step_creation=None):
-        super().__init__(time_step_creation, simulator, None)
+        super().__init__(time_step_creation, simulator)
         self.acked_packet = acked_packet  # packet that the drone who creates it wants to ACK
 
         self.time_of_data_reception = time_of_data_reception # time-step at which the DataPacket was received by node y
@@ -184,9 +222,12 @@ class ACKPacket(Packet):
         self.dst_drone = dst_drone
 
 # To be sent in broadcast for neighbors q_table update
-class EstimationPacket(Packet):
+class EstimationPacket(ControlPacket):
+
+    __slots__ = ("estimate_time_to_depot_x", "queue_time", "transmission_time")
+
     def __init__(self, estimate_time_to_depot_x: int, queue_time: int, transmission_time: int, time_step_creation, simulator):
-        super().__init__(time_step_creation, simulator, None)
+        super().__init__(time_step_creation, simulator)
 
         # Parameters for Q-table update
         self.estimate_time_to_depot_x = estimate_time_to_depot_x
@@ -194,11 +235,13 @@ class EstimationPacket(Packet):
         self.transmission_time = transmission_time
 
 
-class HelloPacket(Packet):
+class HelloPacket(ControlPacket):
     """ The hello message is responsible to give info about neighborhood """
 
+    __slots__ = ("cur_pos", "speed", "next_target", "src_drone")
+
     def __init__(self, src_drone, time_step_creation, simulator, cur_pos, speed, next_target):
-        super().__init__(time_step_creation, simulator, None)
+        super().__init__(time_step_creation, simulator)
         self.cur_pos = cur_pos
         self.speed = speed
         self.next_target = next_target
@@ -209,8 +252,10 @@ class HelloPacket(Packet):
 class Depot(Entity):
     """ The depot is an Entity. """
 
+    __slots__ = ("communication_range", "__buffer")
+
     def __init__(self, coords, communication_range, simulator):
-        super().__init__(id(self), coords, simulator)
+        super().__init__(simulator.new_identifier("depot"), coords, simulator)
         self.communication_range = communication_range
 
         self.__buffer = list()  # also with duplicated packets
@@ -247,6 +292,11 @@ class Depot(Entity):
 # ------------------ Drone ----------------------
 class Drone(Entity):
 
+    __slots__ = ("depot", "path", "speed", "sensing_range", "communication_range", "buffer_max_size",
+                 "residual_energy", "come_back_to_mission", "last_move_routing", "tightest_event_deadline",
+                 "current_waypoint", "trajectory", "mission_step", "__buffer", "distance_from_depot", "move_routing", "routing_algorithm",
+                 "last_mission_coords", "total_energy_consumption")
+
     def __init__(self, identifier: int, path: list, depot: Depot, simulator):
 
         super().__init__(identifier, path[0], simulator)
@@ -265,6 +315,10 @@ class Drone(Entity):
         self.tightest_event_deadline = None  # used later to check if there is an event that is about to expire
         self.current_waypoint = 0
 
+        # the tour compiled once, the position on the mission is looked up from the mission steps flown so far
+        self.trajectory = self.simulator.trajectory(identifier, path)
+        self.mission_step = 0
+
         self.__buffer = []  # contains the packets
 
         self.distance_from_depot = 0
@@ -325,28 +379,6 @@ class Drone(Entity):
         event_time_to_dead = (self.tightest_event_deadline - cur_step) * self.simulator.time_step_duration
         return event_time_to_dead - 5 < time_to_depot <= event_time_to_dead  # 5 seconds of tolerance
 
-    def next_move_to_mission_point(self):
-        """ get the next future position of the drones, according the mission """
-        current_waypoint = self.current_waypoint
-        if current_waypoint >= len(self.path) - 1:
-            current_waypoint = -1
-
-        p0 = self.coords
-        p1 = self.path[current_waypoint + 1]
-        all_distance = utilities.euclidean_distance(p0, p1)
-        distance = self.simulator.time_step_duration * self.speed
-        if all_distance == 0 or distance == 0:
-            return self.path[current_waypoint]
-
-        t = distance / all_distance
-        if t >= 1:
-            return self.path[current_waypoint]
-        elif t <= 0:
-            print("Error move drone, ratio < 0")
-            exit(1)
-        else:
-            return ((1 - t) * p0[0] + t * p1[0]), ((1 - t) * p0[1] + t * p1[1])
-
     def feel_event(self, cur_step):
         """
         feel a new event, and adds the packet relative to it, in its buffer.
@@ -413,6 +445,21 @@ class Drone(Entity):
         self.total_energy_consumption += distance_travelled/10
         
 
+    def mission_move(self, coords):
+        """ Move the drone one step along its mission, to coordinates computed elsewhere
+            (e.g., recorded in a trace or computed by the replica engine).
+        """
+        assert not self.move_routing, "the drone cannot leave its mission"
+        old_coords = self.coords
+
+        self.mission_step += 1
+        self.current_waypoint = self.trajectory.leg(self.mission_step)
+        self.coords = coords
+        self.simulator.metrics.time_on_mission += 1
+
+        distance_travelled = utilities.euclidean_distance(coords, old_coords)
+        self.total_energy_consumption += distance_travelled/10
+
     def is_full(self):
         return self.buffer_length() == self.buffer_max_size
 
@@ -447,46 +494,42 @@ class Drone(Entity):
         elif self.come_back_to_mission:
             return self.last_mission_coords
         else:
-            if self.current_waypoint >= len(self.path) - 1:  # reached the end of the path, start back to 0
-                return self.path[0]
-            else:
-                return self.path[self.current_waypoint + 1]
+            return self.trajectory.next_target(self.mission_step)
 
     def __move_to_mission(self, time):
-        """ When invoked the drone moves on the map. TODO: Add comments and clean.
+        """ When invoked the drone moves on the map, either along its tour or back to where it left it.
             time -> time_step_duration (how much time between two simulation frame)
         """
-        if self.current_waypoint >= len(self.path) - 1:
-            self.current_waypoint = -1
+        if not self.come_back_to_mission:
+            self.mission_step += 1
+            self.current_waypoint = self.trajectory.leg(self.mission_step)
+            if self.simulator.mobility_cache is not None and self.mission_step <= self.simulator.len_simulation:
+                self.coords = self.simulator.mobility_cache.position(self.mission_step, self.identifier)
+            else:
+                self.coords = self.trajectory.position(self.mission_step)
+            return
 
         p0 = self.coords
-        if self.come_back_to_mission:  # after move
-            p1 = self.last_mission_coords
-        else:
-            p1 = self.path[self.current_waypoint + 1]
+        p1 = self.last_mission_coords
 
         all_distance = utilities.euclidean_distance(p0, p1)
         distance = time * self.speed
         if all_distance == 0 or distance == 0:
-            self.__update_position(p1)
+            self.__back_to_mission(p1)
             return
 
         t = distance / all_distance
         if t >= 1:
-            self.__update_position(p1)
+            self.__back_to_mission(p1)
         elif t <= 0:
             print("Error move drone, ratio < 0")
             exit(1)
         else:
             self.coords = (((1 - t) * p0[0] + t * p1[0]), ((1 - t) * p0[1] + t * p1[1]))
 
-    def __update_position(self, p1):
-        if self.come_back_to_mission:
-            self.come_back_to_mission = False
-            self.coords = p1
-        else:
-            self.current_waypoint += 1
-            self.coords = self.path[self.current_waypoint]
+    def __back_to_mission(self, p1):
+        self.come_back_to_mission = False
+        self.coords = p1
 
     def __move_to_depot(self, time):
         """ When invoked the drone moves to the depot. TODO: Add comments and clean.
@@ -57,11 +57,16 @@ def launch_experiments(n_drones, in_seed, out_seed, algorithm):
     @return:
     """
 
+    simulation = None
     for seed in range(in_seed, out_seed):
 
         print(f"Running {algorithm} with {n_drones} drones seed {seed}")
 
-        simulation = sim_setup(n_drones, seed, algorithm)
+        # the simulator is built once, the next seeds reuse its tours and tables
+        if simulation is None:
+            simulation = sim_setup(n_drones, seed, algorithm)
+        else:
+            simulation.reset(seed=seed)
 
         simulation.run()
 
@@ -1,7 +1,6 @@
 from src.entities.uav_entities import DataPacket, ACKPacket, HelloPacket, Packet
+from src.routing_algorithms.net_routing import NeighborTable
 from src.utilities import utilities as util
-from src.utilities import config
-from scipy.stats import norm
 import abc
 
 class BASE_routing(metaclass=abc.ABCMeta):
@@ -10,14 +9,17 @@ class BASE_routing(metaclass=abc.ABCMeta):
         """ The drone that is doing routing and simulator object. """
         self.drone = drone
         self.current_n_transmission = 0
-        self.hello_messages = {}  # {drone_id : most recent hello packet}
+        self.neighbor_table = NeighborTable(simulator.n_drones)  # most recent hello packet of each drone
         self.network_disp = simulator.network_dispatcher
         self.simulator = simulator
-
-        if self.simulator.communication_error_type == config.ChannelError.GAUSSIAN:
-            self.buckets_probability = self.__init_guassian()
         self.no_transmission = False
 
+        # the parameters read at every step
+        self.time_step_duration = simulator.parameters.time_step_duration
+        self.hello_delay = simulator.parameters.hello_delay
+        self.old_hello_packet = simulator.parameters.old_hello_packet
+        self.lil_delta = simulator.parameters.lil_delta
+
     @abc.abstractmethod
     def relay_selection(self, geo_neighbors, packet):
         pass
@@ -28,8 +30,7 @@ class BASE_routing(metaclass=abc.ABCMeta):
     def drone_reception(self, src_drone, packet: Packet, current_ts):
         """ handle reception an ACKs for a packets """
         if isinstance(packet, HelloPacket):
-            src_id = packet.src_drone.identifier
-            self.hello_messages[src_id] = packet  # add packet to our dictionary
+            self.neighbor_table.update(packet)  # add packet to our neighbor table
 
         elif isinstance(packet, DataPacket):
             self.no_transmission = True
@@ -49,7 +50,7 @@ class BASE_routing(metaclass=abc.ABCMeta):
     def drone_identification(self, drones, cur_step):
         """ handle drone hello messages to identify neighbors """
         # if self.drone in drones: drones.remove(self.drone)  # do not send hello to yourself
-        if cur_step % config.HELLO_DELAY != 0:  # still not time to communicate
+        if cur_step % self.hello_delay != 0:  # still not time to communicate
             return
 
         my_hello = HelloPacket(self.drone, cur_step, self.simulator, self.drone.coords,
@@ -86,15 +87,7 @@ class BASE_routing(metaclass=abc.ABCMeta):
 
         if cur_step % self.simulator.drone_retransmission_delta == 0:
 
-            opt_neighbors = []
-            for hpk_id in self.hello_messages:
-                hpk: HelloPacket = self.hello_messages[hpk_id]
-
-                # check if packet is too old
-                if hpk.time_step_creation < cur_step - config.OLD_HELLO_PACKET:
-                    continue
-
-                opt_neighbors.append((hpk, hpk.src_drone))
+            opt_neighbors = self.get_opt_neighbors(cur_step)
 
             if len(opt_neighbors) == 0:
                 return
@@ -129,50 +122,10 @@ class BASE_routing(metaclass=abc.ABCMeta):
                 if packet not in to_be_sent_packets and isinstance(packet, DataPacket):
                     packet.queue_time = 0
 
-    def geo_neighborhood(self, drones, no_error=False):
-        """
-        @param drones:
-        @param no_error:
-        @return: A list all the Drones that are in self.drone neighbourhood (no matter the distance to depot),
-            in all direction in its transmission range, paired with their distance from self.drone
-        """
-
-        closest_drones = []  # list of this drone's neighbours and their distance from self.drone: (drone, distance)
-
-        for other_drone in drones:
-
-            if self.drone.identifier != other_drone.identifier:  # not the same drone
-                drones_distance = util.euclidean_distance(self.drone.coords,
-                                                          other_drone.coords)  # distance between two drones
-
-                if drones_distance <= min(self.drone.communication_range,
-                                          other_drone.communication_range):  # one feels the other & vv
-
-                    # CHANNEL UNPREDICTABILITY
-                    if self.channel_success(drones_distance, no_error=no_error):
-                        closest_drones.append((other_drone, drones_distance))
-
-        return closest_drones
-
-    def channel_success(self, drones_distance, no_error=False):
-        """
-        Precondition: two drones are close enough to communicate. Return true if the communication
-        goes through, false otherwise.
-        """
-
-        assert (drones_distance <= self.drone.communication_range)
-
-        if no_error:
-            return True
-
-        if self.simulator.communication_error_type == config.ChannelError.NO_ERROR:
-            return True
-
-        elif self.simulator.communication_error_type == config.ChannelError.UNIFORM:
-            return self.simulator.rnd_routing.rand() <= self.simulator.drone_communication_success
-
-        elif self.simulator.communication_error_type == config.ChannelError.GAUSSIAN:
-            return self.simulator.rnd_routing.rand() <= self.gaussian_success_handler(drones_distance)
+    def get_opt_neighbors(self, cur_step):
+        """ the drones whose most recent hello packet is not too old """
+        neighbors_ids = self.neighbor_table.valid_ids(cur_step, self.old_hello_packet)
+        return [self.simulator.drones[neighbor_id] for neighbor_id in neighbors_ids]
 
     def broadcast_message(self, packet, src_drone, dst_drones, curr_step):
         """ send a message to my neigh drones"""
@@ -183,12 +136,7 @@ class BASE_routing(metaclass=abc.ABCMeta):
         """ send a message to my neigh drones"""
         self.drone.total_energy_consumption += 0.05
         self.simulator.network_dispatcher.send_packet_to_medium(packet, src_drone, dst_drone,
-                                                                curr_step + config.LIL_DELTA)
-
-    def gaussian_success_handler(self, drones_distance):
-        """ get the probability of the drone bucket """
-        bucket_id = int(drones_distance / self.radius_corona) * self.radius_corona
-        return self.buckets_probability[bucket_id] * config.GUASSIAN_SCALE
+                                                                curr_step + self.lil_delta)
 
     def transfer_to_depot(self, depot, cur_step):
         """ self.drone is close enough to depot and offloads its buffer to it, restarting the monitoring
@@ -197,24 +145,3 @@ class BASE_routing(metaclass=abc.ABCMeta):
         depot.transfer_notified_packets(self.drone, cur_step)
         self.drone.empty_buffer()
         self.drone.move_routing = False
-
-    # --- PRIVATE ---
-    def __init_guassian(self, mu=0, sigma_wrt_range=1.15, bucket_width_wrt_range=.5):
-
-        # bucket width is 0.5 times the communication radius by default
-        self.radius_corona = int(self.drone.communication_range * bucket_width_wrt_range)
-
-        # sigma is 1.15 times the communication radius by default
-        sigma = self.drone.communication_range * sigma_wrt_range
-
-        max_prob = norm.cdf(mu + self.radius_corona, loc=mu, scale=sigma) - norm.cdf(0, loc=mu, scale=sigma)
-
-        # maps a bucket starter to its probability of gaussian success
-        buckets_probability = {}
-        for bk in range(0, self.drone.communication_range, self.radius_corona):
-            prob_leq = norm.cdf(bk, loc=mu, scale=sigma)
-            prob_leq_plus = norm.cdf(bk + self.radius_corona, loc=mu, scale=sigma)
-            prob = (prob_leq_plus - prob_leq) / max_prob
-            buckets_probability[bk] = prob
-
-        return buckets_probability
\ No newline at end of file
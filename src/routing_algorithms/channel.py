@@ -0,0 +1,155 @@
+from functools import lru_cache
+import numpy as np
+import math
+
+"""
+This file contains the channel models. A channel model decides whether a communication between two drones that are
+close enough to communicate goes through. The model is chosen once, when the simulator is built
+(see src.utilities.config.ChannelError), and it offers both a scalar and a batch version of the test.
+"""
+
+
+class ChannelModel:
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def success_probability(self, distances):
+        """ the probability of success of a communication at the given distance(s) """
+        raise NotImplementedError
+
+    def success(self, drones_distance):
+        """ return true if the communication between two drones at the given distance goes through """
+        return self.simulator.rnd_routing.rand() <= self.success_probability(drones_distance)
+
+    def success_mask(self, drones_distances):
+        """ return an array of booleans, true where the communication at the given distance goes through """
+        drones_distances = np.asarray(drones_distances)
+        return self.draws(len(drones_distances)) <= self.success_probability(drones_distances)
+
+    def draws(self, n):
+        """ the n uniform draws that the batch test compares with the probabilities of success """
+        return self.simulator.rnd_routing.sample(n)
+
+
+class NoErrorChannel(ChannelModel):
+    """ Every communication goes through. """
+
+    def success_probability(self, distances):
+        return 1.0
+
+    def success(self, drones_distance):
+        return True
+
+    def success_mask(self, drones_distances):
+        return np.ones(len(drones_distances), dtype=bool)
+
+    def draws(self, n):
+        return np.zeros(n)  # nothing to draw, every communication goes through
+
+
+class UniformChannel(ChannelModel):
+    """ Every communication goes through with the same probability, no matter the distance. """
+
+    def success_probability(self, distances):
+        return self.simulator.drone_communication_success
+
+
+class GaussianChannel(ChannelModel):
+    """ The probability of success decreases with the distance, following a gaussian centered on the drone. """
+
+    def __init__(self, simulator, sigma_wrt_range=1.15, bucket_width_wrt_range=.5):
+        super().__init__(simulator)
+
+        # bucket width is 0.5 times the communication radius by default
+        self.radius_corona = int(simulator.drone_com_range * bucket_width_wrt_range)
+
+        # the table is shared by all the simulators with the same parameters
+        self.buckets_probability = gaussian_success_table(simulator.drone_com_range, sigma_wrt_range,
+                                                          bucket_width_wrt_range, simulator.parameters.gaussian_scale)
+
+    def success_probability(self, distances):
+        """ get the probability of the distance bucket """
+        if isinstance(distances, np.ndarray):
+            return self.buckets_probability[(distances / self.radius_corona).astype(int)]
+        return self.buckets_probability[int(distances / self.radius_corona)]
+
+
+class LogDistanceChannel(ChannelModel):
+    """
+    Log-distance path loss with log-normal shadowing. The link budget is exactly met at the communication range,
+    so that the probability of success is 1 close to the drone, 0.5 at the communication range and it decreases
+    as fast as the path loss exponent says.
+    """
+
+    def __init__(self, simulator):
+        super().__init__(simulator)
+
+        # the table is shared by all the simulators with the same parameters
+        self.meters_probability = log_distance_success_table(simulator.drone_com_range,
+                                                             simulator.parameters.path_loss_exponent,
+                                                             simulator.parameters.shadowing_sigma)
+
+    def success_probability(self, distances):
+        """ get the probability of the distance, with a resolution of one meter """
+        if isinstance(distances, np.ndarray):
+            return self.meters_probability[distances.astype(int)]
+        return self.meters_probability[int(distances)]
+
+
+def normal_cdf(x, sigma):
+    """ cumulative distribution function of the zero-mean gaussian """
+    return 0.5 * (1 + math.erf(x / (sigma * math.sqrt(2))))
+
+
+@lru_cache(maxsize=None)
+def gaussian_success_table(communication_range, sigma_wrt_range, bucket_width_wrt_range, scale):
+    """
+    Compute the probability of success of a communication for each bucket of distance, under a gaussian channel
+    error centered on the drone. The table is computed once per process for each set of parameters.
+
+    @param communication_range: the communication range of the drones
+    @param sigma_wrt_range: sigma of the gaussian, w.r.t. the communication range (e.g., 1.15 times the range)
+    @param bucket_width_wrt_range: width of a bucket of distance, w.r.t. the communication range
+    @param scale: scale the probability of success (see SimulationParameters.gaussian_scale)
+    @return: a read-only array whose i-th entry is the probability of success at distance
+        [i * bucket width, (i + 1) * bucket width)
+    """
+    radius_corona = int(communication_range * bucket_width_wrt_range)
+    sigma = communication_range * sigma_wrt_range
+
+    max_prob = normal_cdf(radius_corona, sigma) - normal_cdf(0, sigma)
+
+    # maps a bucket to its probability of gaussian success
+    buckets_probability = [(normal_cdf(bk + radius_corona, sigma) - normal_cdf(bk, sigma)) / max_prob * scale
+                           for bk in range(0, communication_range, radius_corona)]
+
+    # the distance can be exactly equal to the communication range, it falls in the last bucket
+    buckets_probability.append(buckets_probability[-1])
+
+    table = np.array(buckets_probability)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=None)
+def log_distance_success_table(communication_range, path_loss_exponent, shadowing_sigma):
+    """
+    Compute the probability of success of a communication for each meter of distance, under the log-distance
+    path loss model. The extra path loss at distance d w.r.t. the communication range R is
+    10 * path_loss_exponent * log10(d / R) dB, the communication goes through if the shadowing (zero-mean gaussian
+    with sigma shadowing_sigma dB) does not exceed the remaining margin.
+
+    @param communication_range: the communication range of the drones
+    @param path_loss_exponent: the path loss exponent (2 in free space, 2.7 - 3.5 in urban areas)
+    @param shadowing_sigma: the standard deviation of the shadowing, in dB
+    @return: a read-only array whose i-th entry is the probability of success at distance [i, i + 1) meters
+    """
+    meters_probability = [1.0]  # no loss right next to the drone
+    for meters in range(1, int(communication_range) + 1):
+        margin = 10 * path_loss_exponent * math.log10(communication_range / meters)
+        meters_probability.append(normal_cdf(margin, shadowing_sigma))
+
+    table = np.array(meters_probability)
+    table.flags.writeable = False
+    return table
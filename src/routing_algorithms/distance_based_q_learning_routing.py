@@ -1,9 +1,8 @@
 from src.routing_algorithms.BASE_routing import BASE_routing
 from src.entities.uav_entities import Drone, Packet
-from src.utilities.utilities import TraversedCells, euclidean_distance
-from math import inf, floor
-from numpy.random import random, choice
-from copy import deepcopy
+from src.utilities.utilities import euclidean_distance
+from math import floor
+import numpy as np
 
 class DistanceBasedQLearningRouting(BASE_routing):
 
@@ -16,9 +15,11 @@ class DistanceBasedQLearningRouting(BASE_routing):
         self.epsilon: float = 0.1 # for exploration-exploitation tradeoff
         self.optimistic_initial_values: int = 5
 
-        # an action is simply a drone (if action == None then action == self.drone)
-        self.q_table: dict = {} # state: action: float (q_value)
-        self.state_actions: dict = {} # state: action: int (number of times that action has been selected in that state)
+        # a state is the integer id of the cell the drone is in, an action is the identifier of a drone
+        # (if action == None then action == self.drone)
+        n_cells = simulator.cell_grid.n_cells
+        self.q_table: np.ndarray = np.full((n_cells, simulator.n_drones), self.optimistic_initial_values, dtype=float) # state x action: q_value
+        self.state_actions: np.ndarray = np.zeros((n_cells, simulator.n_drones), dtype=int) # state x action: number of times that action has been selected in that state
 
         self.exploration_counter: int = 0 # number of times a random action was chosen
         self.exploitation_counter: int = 0 # number of times the drone exploited q_values
@@ -52,10 +53,11 @@ class DistanceBasedQLearningRouting(BASE_routing):
             # compute reward
             reward = self.reward_function(delay, outcome)
 
-            max_next_action_value = max(list(self.q_table[successor].values()))
+            max_next_action_value = self.q_table[successor].max()
 
             # update q_table
-            self.q_table[state][action] = self.q_table[state][action] + self.alpha*(reward + self.gamma*max_next_action_value - self.q_table[state][action])
+            q_sa = self.q_table[state, action]
+            self.q_table[state, action] = q_sa + self.alpha*(reward + self.gamma*max_next_action_value - q_sa)
             self.q_updates += 1
             
             # remove the entry, the action has received the feedback
@@ -66,42 +68,34 @@ class DistanceBasedQLearningRouting(BASE_routing):
         This function returns the best relay to send packets.
 
         @param packet:
-        @param opt_neighbors: a list of tuple (hello_packet, source_drone)
+        @param opt_neighbors: a list of drones
         @return: The best drone to use as relay
         """
         
-        # compute the state the drone is in, if it is a new state then add it to the q_table
-        state = State(self.drone, self.simulator)
-        if state not in self.q_table:
-            self.q_table[state] = {drone: self.optimistic_initial_values for drone in self.simulator.drones}
+        # compute the state the drone is in
+        # the state of the drone is given just by the position of the drone itself in the (discretized) AoI
+        state = self.simulator.cell_grid.cell_of(self.drone.coords)
 
         # give drones a fair chance to explore some actions before exploiting them
         if self.exploration_counter <= self.simulator.n_drones:
-            action = self.random_policy([neighbor[1] for neighbor in opt_neighbors])
+            action = self.random_policy(opt_neighbors)
         else:
-            action = self.distance_based_epsilon_greedy(state, [neighbor[1] for neighbor in opt_neighbors])
+            action = self.distance_based_epsilon_greedy(state, opt_neighbors)
 
-        # compute successor state, if it is a new state then add it to the q_table
-        successor = state.successor_estimate(self.drone, self.simulator)
-        if successor not in self.q_table:
-            self.q_table[successor] = {drone: self.optimistic_initial_values for drone in self.simulator.drones}
-        if successor not in self.state_actions:
-            self.state_actions[successor] = {}
+        # compute successor state
+        # the successor state is computed as the next position of the drone in the (discretized) AoI,
+        # this next position is the next waypoint on the drones's path.
+        # notice that the successor state is not defined by the action taken by the drone
+        successor = self.simulator.cell_grid.cell_of(self.drone.next_target())
 
         if action == None:
             action = self.drone
 
         # Store your current action --- you can add some stuff if needed to take a reward later
-        self.taken_actions[packet.event_ref.identifier] = (state, action, successor)
-        
-        # record actions taken in each state and number of times those actions have been taken in that state
-        if state not in self.state_actions:
-            self.state_actions[state] = {action: 1}
-        else:
-            if action in self.state_actions[state]:
-                self.state_actions[state][action] += 1
-            else:
-                self.state_actions[state][action] = 1
+        self.taken_actions[packet.event_ref.identifier] = (state, action.identifier, successor)
+
+        # record the number of times each action has been taken in each state
+        self.state_actions[state, action.identifier] += 1
 
         return action  # here you should return a drone object!
 
@@ -109,7 +103,7 @@ class DistanceBasedQLearningRouting(BASE_routing):
     def distance_based_epsilon_greedy(self, state, neighbors: list) -> Drone:
         if len(neighbors) == 0 or euclidean_distance(self.drone.coords, self.drone.depot.coords) <= self.drone.communication_range:
             return None
-        p = random()
+        p = self.simulator.rnd_routing.rand()
         if p <= 1 - self.epsilon:
             return self.distance_greedy_policy(state, neighbors)
         return self.random_policy(neighbors)
@@ -118,18 +112,16 @@ class DistanceBasedQLearningRouting(BASE_routing):
     # neighbors that don't have the maximum q_value but are closer to the depot have a chance to be selected
     # executed w.p. 1-epsilon for action selection
     def distance_greedy_policy(self, state, neighbors: list) -> Drone:
-        max = -inf
-        best_action = None
-        for neighbor in neighbors:
-            neighbor_distance_to_depot = euclidean_distance(neighbor.coords, self.drone.depot.coords)
-            # i think we never go in the body of this if condition
-            if neighbor_distance_to_depot <= neighbor.communication_range:  # communication_range is 200
-                return neighbor
-            scaled_down_neighbor_distance_to_depot = neighbor_distance_to_depot/100   # we have always something > 1 since communication_range is always 200
-            # give weights to q_values with respect to the distance of the neighbor to the depot
-            if (1/scaled_down_neighbor_distance_to_depot)*self.q_table[state][neighbor] > max:
-                max = self.q_table[state][neighbor]*(1/scaled_down_neighbor_distance_to_depot)
-                best_action = neighbor
+        neighbors_distance_to_depot = np.array([euclidean_distance(neighbor.coords, self.drone.depot.coords) for neighbor in neighbors])
+        neighbors_range = np.array([neighbor.communication_range for neighbor in neighbors])
+        # i think we never go in the body of this if condition
+        in_range = np.flatnonzero(neighbors_distance_to_depot <= neighbors_range)  # communication_range is 200
+        if len(in_range) > 0:
+            return neighbors[in_range[0]]
+        scaled_down_neighbors_distance_to_depot = neighbors_distance_to_depot/100   # we have always something > 1 since communication_range is always 200
+        # give weights to q_values with respect to the distance of the neighbor to the depot
+        weighted_q_values = (1/scaled_down_neighbors_distance_to_depot)*self.q_table[state, [neighbor.identifier for neighbor in neighbors]]
+        best_action = neighbors[int(np.argmax(weighted_q_values))]
         self.exploitation_counter += 1
         return best_action
 
@@ -137,7 +129,7 @@ class DistanceBasedQLearningRouting(BASE_routing):
     # executed w.p. epsilon for action selection
     def random_policy(self, neighbors: list) -> Drone:
         self.exploration_counter += 1
-        return choice(neighbors + [None])
+        return self.simulator.rnd_routing.choice(neighbors + [None])
 
     # simple reward function
     def reward_function(self, delay: int, outcome: int) -> int:
@@ -148,39 +140,3 @@ class DistanceBasedQLearningRouting(BASE_routing):
             # packet delivered -> good reward
             # if the packet is delivered within the first half of its lifetime then we have a little bonus of +1 to the reward for the drone
             return 2 + floor(1000/delay)
-    
-class State:
-
-    # the state of the drone is given just by the position of the drone itself in the (discretized) AoI
-    def __init__(self, drone: Drone, simulator):
-        self.id = drone.identifier
-        self.cell = TraversedCells.coord_to_cell(size_cell=simulator.prob_size_cell,
-            width_area=simulator.env_width,
-            x_pos=drone.coords[0],  
-            y_pos=drone.coords[1])[0]
-
-    # the successor state is computed as the next position of the drone in the (discretized) AoI
-    # this next position is the next waypoint on the drones's path
-    # this function is called in "relay_selection()" after a packet is sent off to a neighbor
-    # notice that the successor state is not defined by the action taken by the drone
-    def successor_estimate(self, drone: Drone, simulator):
-        succ = self.copy()
-        succ.cell = TraversedCells.coord_to_cell(size_cell=simulator.prob_size_cell,
-            width_area=simulator.env_width,
-            x_pos=drone.next_target()[0],  
-            y_pos=drone.next_target()[1])[0]
-        return succ
-
-    def __str__(self) -> str:
-        return f'''Drone {self.id} is in cell {self.cell}'''
-
-    def __hash__(self) -> int:
-        return hash((self.id))
-
-    def __eq__(self, other) -> bool:
-        if isinstance(other, State):
-            return self.id == other.id and self.cell == other.cell
-        return False
-
-    def copy(self):
-        return deepcopy(self)
\ No newline at end of file
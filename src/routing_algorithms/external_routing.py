@@ -0,0 +1,38 @@
+from src.routing_algorithms.BASE_routing import BASE_routing
+
+class ExternalRouting(BASE_routing):
+    """
+    The relay is chosen outside of the simulation, e.g., by a policy in training (see src.simulation.vector_env).
+    Before each decision the controller sets the action of the drone, the routing sends the packets to that drone
+    if it is a neighbor, and it keeps them otherwise.
+    """
+
+    def __init__(self, drone, simulator):
+        BASE_routing.__init__(self, drone, simulator)
+        self.action = None  # the identifier of the relay chosen by the controller, None keeps the packets
+        self.taken_actions = set()  # the events of the packets the drone decided on
+        self.reward = 0  # the outcomes of the packets the drone decided on, since the controller collected them
+
+    def feedback(self, drone, id_event: int, delay: int, outcome: int):
+        """
+        Feedback returned when the packet arrives at the depot (outcome 1) or expires (outcome -1),
+        it is credited to the drone that decided on the packet.
+        """
+        if id_event in self.taken_actions:
+            self.reward += outcome
+            self.taken_actions.remove(id_event)
+
+    def relay_selection(self, opt_neighbors: list, packet):
+        """
+        This function returns the relay chosen by the controller.
+
+        @param opt_neighbors: a list of drones
+        @param packet:
+        @return: the chosen drone if it is a neighbor, None otherwise
+        """
+        self.taken_actions.add(packet.event_ref.identifier)
+
+        for neighbor in opt_neighbors:
+            if neighbor.identifier == self.action:
+                return neighbor
+        return None
@@ -1,8 +1,7 @@
 from src.routing_algorithms.BASE_routing import BASE_routing
 from src.entities.uav_entities import Drone, Packet, HelloPacket, EstimationPacket, ACKPacket, DataPacket
-from src.utilities.utilities import euclidean_distance, config
-from math import inf, floor, exp
-from numpy.random import random, choice
+from src.utilities.utilities import euclidean_distance
+from math import inf, floor, exp, isinf
 
 # State-of-the-art "Fully-Echoed Q-Routing" protocol
 class FullyEchoedQLearningRouting(BASE_routing):
@@ -28,7 +27,7 @@ class FullyEchoedQLearningRouting(BASE_routing):
 
         # Simulated-Annealing Parameters
         self.k: int = 0 # Current routing step (i.e., number of actions taken)
-        self.k_max: int = floor((config.TS_DURATION * config.SIM_DURATION)/3) # Starting maximum number of exploratory actions
+        self.k_max: int = floor((simulator.parameters.time_step_duration * simulator.parameters.len_simulation)/3) # Starting maximum number of exploratory actions
         self.T: float = self.k_max # Simulated-annealing temperature, initialized at its maximum value
         self.f: float = 1 # Parameter used to adjust the temperature w.r.t. changes in network stability. Initialized at 1 so that the temperature is not affected by "self.f" in the first few iterations
 
@@ -36,11 +35,21 @@ class FullyEchoedQLearningRouting(BASE_routing):
         self.H: int = 10 # Length of the history of Q-values changes to be considered, the paper uses H=10
         self.last_H_updates: list = [1]*self.H # Q-values changes detected in the last "H" iterations, initially all equal to 1 (to avoid "self.f = 0" in the first iterations)
         self.last_H_index: int = -1 # Keep track of what was the last updated index in the "self.last_H_updates" list (needed for the list update)
+        self.last_H_variations: list = [0]*(self.H-1) # Absolute variation between consecutive entries of "self.last_H_updates"
+        self.total_variation: float = 0 # Sum of "self.last_H_variations", updated only when the history changes
              
         # Constant that is multiplied with the transmission time before updating Q-values to have more impact on their change.
         # This is done because the transmission time would be always equal to 1 time-step (i.e., 0.15 seconds)
         self.c: int = 3
 
+        # Neighbors view and minimum Q-value among them, cached for the current time-step.
+        # The view is dropped when a new HelloPacket is received or the time-step changes,
+        # the minimum is kept up to date on every Q-table write (see "set_q_value()")
+        self.opt_neighbors_ts: int = None # Time-step at which "self.opt_neighbors" was computed
+        self.opt_neighbors: list = [] # Cached result of "get_opt_neighbors()"
+        self.opt_neighbors_ids: set = set() # Identifiers of the drones in "self.opt_neighbors"
+        self.min_estimate: tuple = None # (minimum Q-value, drone identifier) over "self.opt_neighbors", None if it must be recomputed
+
 
     # Override of the "drone_reception()" method declared in "Base_routing" class. 
     # Thanks to this override we don't interfere with the standard functionalities
@@ -51,8 +60,8 @@ class FullyEchoedQLearningRouting(BASE_routing):
         """ Handle reception of a packet """
 
         if isinstance(packet, HelloPacket):
-            src_id = packet.src_drone.identifier
-            self.hello_messages[src_id] = packet # Add packet to our dictionary
+            self.neighbor_table.update(packet) # Add packet to our neighbor table
+            self.opt_neighbors_ts = None # The neighbors view must be recomputed
 
         # Node y receives a DataPacket from node x.
         # Node y must send back to node x (through an ACKPacket) the estimate of the delivery time (t_{y->D})
@@ -74,14 +83,8 @@ class FullyEchoedQLearningRouting(BASE_routing):
             queue_time = packet.queue_time
             packet.queue_time = 0
 
-            # Get the neighbors of node y
-            opt_neighbors = self.get_opt_neighbors(current_ts)
-
-            # Check if the neighbors of the drone are in the Q-table
-            self.check_new_neighbors(opt_neighbors)
-
-            # Compute node y estimate of delivery time to D, i.e., t_{y->D}
-            estimate_time_to_depot_y = self.compute_estimate_time_to_depot([neighbor[1] for neighbor in opt_neighbors])
+            # Compute node y estimate of delivery time to D, i.e., t_{y->D}, over the neighbors of node y
+            estimate_time_to_depot_y = self.current_estimate_time_to_depot(current_ts)
 
             # Node y sends the ACKPacket to node x
             ack_packet = ACKPacket(self.drone, src_drone, time_of_data_reception, time_of_data_forwarding, queue_time, estimate_time_to_depot_y, self.simulator, packet, current_ts)
@@ -95,31 +98,31 @@ class FullyEchoedQLearningRouting(BASE_routing):
                 self.current_n_transmission = 0
                 self.drone.move_routing = False
 
-            # Receive node y estimate of delivery time to D
+            # Receive node y estimate of delivery time to D.
+            # Node y has no estimate when it has no neighbors, the Q-value is not updated then
             estimate_time_to_depot_y = packet.estimate_time_to_depot_y
+            if isinf(estimate_time_to_depot_y):
+                return
 
             # Compute transmission time and queue time, the transmission time is multiplied by a constant to have more impact on the Q-value update.
             # The transmission time (without considering "self.c") is always equal to 1 time step i.e., 0.15s 
-            transmission_time = (packet.time_of_data_reception - packet.time_of_data_forwarding) * config.TS_DURATION * self.c 
-            queue_time = packet.queue_time * config.TS_DURATION
+            transmission_time = (packet.time_of_data_reception - packet.time_of_data_forwarding) * self.time_step_duration * self.c 
+            queue_time = packet.queue_time * self.time_step_duration
 
             # Update node x Q-table w.r.t. the estimate received from node y (using the fixed learning rate "eta").
             # We record the change in the Q-value in the history
-            self.q_table[src_drone.identifier] += self.eta*(transmission_time + queue_time + estimate_time_to_depot_y - self.q_table[src_drone.identifier]) 
+            self.set_q_value(src_drone.identifier, self.q_table[src_drone.identifier] + self.eta*(transmission_time + queue_time + estimate_time_to_depot_y - self.q_table[src_drone.identifier]))
             self.update_changes_history(self.q_table[src_drone.identifier])
 
             # Get the neighbors of node x
             opt_neighbors = self.get_opt_neighbors(current_ts)
 
-            # Check if the neighbors of the drone are in the Q-table
-            self.check_new_neighbors(opt_neighbors)
-
             # Compute node x estimate of delivery time to D, i.e. t_{x->D}
-            estimate_time_to_depot_x = self.compute_estimate_time_to_depot([neighbor[1] for neighbor in opt_neighbors])
+            estimate_time_to_depot_x = self.current_estimate_time_to_depot(current_ts)
             
             # Send t_{x->D} to neighbors so that they can update their Q-table
             est_pck = EstimationPacket(estimate_time_to_depot_x, queue_time, transmission_time, current_ts, self.simulator)
-            self.broadcast_message(est_pck, self.drone, [neighbor[1] for neighbor in opt_neighbors], current_ts)
+            self.broadcast_message(est_pck, self.drone, opt_neighbors, current_ts)
 
         # Update neighbor Q-table using estimate received from node x (using the dynamic learning rate "eta_2")
         elif isinstance(packet, EstimationPacket):
@@ -127,13 +130,16 @@ class FullyEchoedQLearningRouting(BASE_routing):
             queue_time = packet.queue_time
             estimate_time_to_depot_x = packet.estimate_time_to_depot_x
 
+            # Node x has no estimate, or node x was never heard (its hello packets were lost): nothing to update
+            if isinf(estimate_time_to_depot_x) or self.neighbor_table.last_seen[src_drone.identifier] == -inf:
+                return
+
             if src_drone.identifier not in self.q_table:
-                src_hello = self.hello_messages[src_drone.identifier]
-                self.q_table[src_drone.identifier] = euclidean_distance(src_hello.cur_pos, self.drone.depot.coords)/src_hello.speed
+                self.set_q_value(src_drone.identifier, self.initial_q_value(src_drone.identifier))
 
             # Update node x Q-table w.r.t. the estimate received from node x (using "eta_2" learning rate).
             # Here we don't record the change in the Q-value. We record changes only when a DataPacket is forwarded
-            self.q_table[src_drone.identifier] += self.eta_2*(transmission_time + queue_time + estimate_time_to_depot_x - self.q_table[src_drone.identifier]) 
+            self.set_q_value(src_drone.identifier, self.q_table[src_drone.identifier] + self.eta_2*(transmission_time + queue_time + estimate_time_to_depot_x - self.q_table[src_drone.identifier]))
 
     # The "feedback" function is not used (or useful) for the "Fully-Echoed Q-Routing" protocol
     def feedback(self, drone: Drone, id_event: int, delay: int, outcome: int):
@@ -170,7 +176,7 @@ class FullyEchoedQLearningRouting(BASE_routing):
         This function returns the best relay to send packets.
 
         @param packet:
-        @param opt_neighbors: a list of tuple (hello_packet, source_drone)
+        @param opt_neighbors: a list of drones
         @return: The best drone to use as relay
         """
 
@@ -180,11 +186,9 @@ class FullyEchoedQLearningRouting(BASE_routing):
         # Check if the current neighbors of the drone are in the Q-table
         self.check_new_neighbors(opt_neighbors)
 
-        neighbors = [neighbor[1] for neighbor in opt_neighbors]
-
         # Neighbors that never received the current DataPacket.
         # Computed to enforce a (weak) loop-free property
-        trimmed_neighbors = list(set(neighbors).difference(packet.hops))
+        trimmed_neighbors = [neighbor for neighbor in opt_neighbors if not packet.has_hop(neighbor)]
 
         # Update the temperature "self.T"
         self.update_temperature()
@@ -197,7 +201,7 @@ class FullyEchoedQLearningRouting(BASE_routing):
         if trimmed_neighbors:
             action = self.action_selection(trimmed_neighbors)
         else:
-            action = self.action_selection(neighbors)
+            action = self.action_selection(opt_neighbors)
             
         # Store your current action --- you can add some stuff if needed to take a reward later
         self.taken_actions[packet.event_ref.identifier] = (action)
@@ -218,7 +222,7 @@ class FullyEchoedQLearningRouting(BASE_routing):
     # It basically consists in an epsilon-greedy where "epsilon" depends on the temperature "self.T".
     # It is a workaround of the action selection policy presented in the paper
     def action_selection(self, neighbors: list) -> Drone:
-        r = random()
+        r = self.simulator.rnd_routing.rand()
         # When the temperature is high "epsilon" gets closer to 1
         epsilon = exp(-10/self.T)
         # Exploitation 
@@ -232,18 +236,15 @@ class FullyEchoedQLearningRouting(BASE_routing):
         # Exploration
         else:
             self.exploration_counter += 1
-            action = choice(neighbors + [self.drone])
+            action = self.simulator.rnd_routing.choice(neighbors + [self.drone])
         return action
 
     # Function that evaluates the parameter "self.f". 
     # "self.f" must be in the [0.5, 10] range
     def evaluate_parameter_f(self):
-        self.f = 0
-        # Compute the total variation in the Q-values over the last "H" routing steps
-        for i in range(len(self.last_H_updates)-1):
-            self.f += abs(self.last_H_updates[i+1] - self.last_H_updates[i])
+        # The total variation in the Q-values over the last "H" routing steps is kept by "update_changes_history()".
         # Scale down the parameter
-        self.f = self.f/self.H
+        self.f = self.total_variation/self.H
         # Safety checks to make sure that "f" is in the [0.5, 10] range
         if self.f < 0.5:
             self.f = 0.5
@@ -272,47 +273,73 @@ class FullyEchoedQLearningRouting(BASE_routing):
     # When a drone updates its Q-table (after forwarding a DataPacket) it immediately registers the new Q-value in its history.
     # This update is done ONLY for DataPackets. The history must be related to DataPackets only. 
     # If a drone updates its Q-table after receiving an "EstimationPacket" then it won't update its history
+    # Only the (at most two) variations involving the updated entry change, the total is then summed again in
+    # index order so that it is exactly the value a full recomputation would give
     def update_changes_history(self, new_q_value: float):
         self.last_H_index = (self.last_H_index + 1) % self.H
         self.last_H_updates[self.last_H_index] = new_q_value
+        if self.last_H_index > 0:
+            self.last_H_variations[self.last_H_index-1] = abs(self.last_H_updates[self.last_H_index] - self.last_H_updates[self.last_H_index-1])
+        if self.last_H_index < self.H-1:
+            self.last_H_variations[self.last_H_index] = abs(self.last_H_updates[self.last_H_index+1] - self.last_H_updates[self.last_H_index])
+        self.total_variation = sum(self.last_H_variations)
 
     # Function used to update the dynamic learning rate "eta_2".
     # The delivery time estimates "T_est" and "T_max" must be updated first
     def update_dynamic_learning_rate(self, current_ts: int):
-        opt_neighbors = self.get_opt_neighbors(current_ts)
-        self.check_new_neighbors(opt_neighbors)
         # In the case of this simulator "T_est" is equal just to the minimum Q-value.
         # The original formula to compute "T_est" does a sum over all possible destinations 
         # but in our case we have just one destination. 
         # The simulator simply puts us in a special case
-        self.T_est = self.compute_estimate_time_to_depot([neighbor[1] for neighbor in opt_neighbors])
+        self.T_est = self.current_estimate_time_to_depot(current_ts)
         self.T_max = max(self.T_max, self.T_est)
         self.eta_2 = (self.T_est/self.T_max) * self.eta * self.echo_rate
 
     # Check if the neighbors of the drone are not in the Q-table
     def check_new_neighbors(self, opt_neighbors: list):
-        for hpk, neighbor in opt_neighbors:
+        for neighbor in opt_neighbors:
             if neighbor.identifier not in self.q_table:
-                self.q_table[neighbor.identifier] = euclidean_distance(hpk.cur_pos, self.drone.depot.coords)/hpk.speed
+                self.set_q_value(neighbor.identifier, self.initial_q_value(neighbor.identifier))
+
+    # Initial Q-value of a neighbor: the time it needs to reach the depot, according to its most recent hello message
+    def initial_q_value(self, drone_id: int) -> float:
+        cur_pos = self.neighbor_table.positions[drone_id].tolist()
+        return euclidean_distance(cur_pos, self.drone.depot.coords)/self.neighbor_table.speeds[drone_id].item()
+
+    # Every write in the Q-table goes through here, to keep the minimum Q-value among the current neighbors up to date
+    def set_q_value(self, drone_id: int, q_value: float):
+        self.q_table[drone_id] = q_value
+        if self.min_estimate is None or drone_id not in self.opt_neighbors_ids:
+            return
+        best, best_id = self.min_estimate
+        if q_value < best:
+            self.min_estimate = (q_value, drone_id)
+        elif drone_id == best_id and q_value > best:
+            self.min_estimate = None # The minimum may now be another neighbor, recompute it when needed
+
+    # Minimum Q-value among the current neighbors of the drone, i.e., its estimate of the delivery time to the depot
+    def current_estimate_time_to_depot(self, current_ts: int) -> float:
+        opt_neighbors = self.get_opt_neighbors(current_ts)
+        if self.min_estimate is None:
+            best, best_id = inf, None
+            for neighbor in opt_neighbors:
+                if self.q_table[neighbor.identifier] < best:
+                    best, best_id = self.q_table[neighbor.identifier], neighbor.identifier
+            self.min_estimate = (best, best_id)
+        return self.min_estimate[0]
 
     # Support function used in the "drone_reception()" method.
-    # It computes the minimum Q-value in the drone's Q-table
-    def compute_estimate_time_to_depot(self, neighbors: list) -> float:
-        estimate_time_to_depot = inf
-        for neighbor in neighbors:
-            if self.q_table[neighbor.identifier] < estimate_time_to_depot:
-                estimate_time_to_depot = self.q_table[neighbor.identifier]
-        return estimate_time_to_depot
-
-    # Support function used in the "drone_reception()" method
+    # The neighbors are computed once per time-step (or new HelloPacket) and they are added to the Q-table if needed
     def get_opt_neighbors(self, current_ts: int) -> list:
-        opt_neighbors = []
-        for hpk_id in self.hello_messages:
-            hpk: HelloPacket = self.hello_messages[hpk_id]
-            # check if packet is too old
-            if hpk.time_step_creation < current_ts - config.OLD_HELLO_PACKET:
-                continue
-            opt_neighbors.append((hpk, hpk.src_drone))
+        if self.opt_neighbors_ts == current_ts:
+            return self.opt_neighbors
+        opt_neighbors = BASE_routing.get_opt_neighbors(self, current_ts)
+        self.opt_neighbors_ts = current_ts
+        self.opt_neighbors = opt_neighbors
+        self.opt_neighbors_ids = {neighbor.identifier for neighbor in opt_neighbors}
+        self.min_estimate = None
+        # Check if the neighbors of the drone are in the Q-table
+        self.check_new_neighbors(opt_neighbors)
         return opt_neighbors
 
 ###################################################
\ No newline at end of file
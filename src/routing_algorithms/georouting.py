@@ -1,5 +1,6 @@
 from src.routing_algorithms.BASE_routing import BASE_routing
 from src.utilities.utilities import euclidean_distance
+import numpy as np
 
 class GeoRouting(BASE_routing):
 
@@ -11,7 +12,7 @@ class GeoRouting(BASE_routing):
         This function returns a relay for packets according to geographic routing.
 
         @param packet:
-        @param opt_neighbors: a list of tuples (hello_packet, drone)
+        @param opt_neighbors: a list of drones
         @return: The best drone to use as relay or None if no relay is selected
         """
 
@@ -19,14 +20,11 @@ class GeoRouting(BASE_routing):
         depot_pos = self.drone.depot.coords
         # my_distance_to_depot = util.euclidean_distance(cur_pos, depot_pos)
 
-        best_distance = euclidean_distance(cur_pos, depot_pos)
-        best_drone = None
-        for hello, neighbor in opt_neighbors:
-            neighbor_pos = hello.cur_pos
-            neighbor_distance_to_depot = euclidean_distance(neighbor_pos, depot_pos)
-            # my_distance_to_neighbor = util.euclidean_distance(cur_pos, neighbor_pos)
-            if neighbor_distance_to_depot < best_distance:
-                best_drone = neighbor
-                best_distance = neighbor_distance_to_depot
+        # distances to the depot of the positions advertised in the hello packets
+        neighbors_distance_to_depot = self.neighbor_table.distances_to([neighbor.identifier for neighbor in opt_neighbors],
+                                                                       depot_pos)
+        best_neighbor = int(np.argmin(neighbors_distance_to_depot))
 
-        return best_drone
\ No newline at end of file
+        if neighbors_distance_to_depot[best_neighbor] < euclidean_distance(cur_pos, depot_pos):
+            return opt_neighbors[best_neighbor]
+        return None
@@ -1,12 +1,14 @@
-import src.utilities.utilities as util
 from src.entities.uav_entities import DataPacket
 from src.simulation.metrics import Metrics
+import numpy as np
 
 class MediumDispatcher:
 
-    def __init__(self, metric_class: Metrics):
+    def __init__(self, metric_class: Metrics, simulator):
         self.packets = []
         self.metric_class = metric_class
+        self.simulator = simulator
+        self.medium_channel_error = simulator.parameters.medium_channel_error
 
     def send_packet_to_medium(self, packet, src_drone, dst_drone, to_send_ts):
         if isinstance(packet, DataPacket):
@@ -17,23 +19,94 @@ class MediumDispatcher:
         self.packets.append((packet, src_drone, dst_drone, to_send_ts))
 
     def run_medium(self, current_ts):
-        to_drop_indices = []
-        original_self_packets = self.packets[:]
-        self.packets = []
+        to_send = self.pop_due_packets(current_ts)
+        if len(to_send) > 0:
+            self.deliver(to_send, self.reachable(to_send, current_ts), current_ts)
+
+    def pop_due_packets(self, current_ts):
+        """ take out of the medium the packets to send at current_ts, the others keep waiting """
+        to_send = [entry for entry in self.packets if entry[3] == current_ts
+                   and entry[1].identifier != entry[2].identifier]
+        self.packets = [entry for entry in self.packets if entry[3] != current_ts]
+        return to_send
+
+    def reachable(self, to_send, current_ts, drones_distances=None):
+        """
+        Decide which packets reach their destination.
+
+        @param to_send: the packets to send, as stored in the medium
+        @param current_ts: the current time step
+        @param drones_distances: the distances between the sources and the destinations, if already computed
+        @return: an array of booleans, true for the packets that reach their destination
+        """
+        if self.simulator.contact_plan is None:
+            if drones_distances is None:
+                drones_distances = self.distances(to_send)
+            ranges = np.array([min(src_drone.communication_range, dst_drone.communication_range)
+                               for _, src_drone, dst_drone, _ in to_send])
+            delivered = drones_distances <= ranges
+        else:  # the contacts are known in advance
+            delivered = np.array([self.simulator.contact_plan.in_contact(src_drone.identifier,
+                                                                         dst_drone.identifier, current_ts)
+                                  for _, src_drone, dst_drone, _ in to_send])
+
+        if self.medium_channel_error:
+            if drones_distances is None:
+                drones_distances = self.distances(to_send)
+            delivered[delivered] = self.simulator.channel.success_mask(drones_distances[delivered])
+
+        return delivered
+
+    def deliver(self, to_send, delivered, current_ts):
+        """ the destinations receive the packets that reach them, in the order they were sent """
+        for i in np.flatnonzero(delivered):
+            packet, src_drone, dst_drone, _ = to_send[i]
+            dst_drone.routing_algorithm.drone_reception(src_drone, packet, current_ts)  # reception of a packet
+
+    @staticmethod
+    def distances(to_send):
+        """ the distance between the source and the destination of each packet """
+        src_coords = np.array([src_drone.coords for _, src_drone, _, _ in to_send])
+        dst_coords = np.array([dst_drone.coords for _, _, dst_drone, _ in to_send])
+        deltas = src_coords - dst_coords
+        return np.sqrt(deltas[:, 0] ** 2 + deltas[:, 1] ** 2)
+
+
+class NeighborTable:
+    """ The most recent hello message heard from each drone, kept in arrays indexed by drone identifier. """
+
+    def __init__(self, n_drones):
+        self.last_seen = np.full(n_drones, -np.inf)  # time step creation of the most recent hello message
+        self.positions = np.zeros((n_drones, 2))
+        self.speeds = np.zeros(n_drones)
+        self.next_targets = np.zeros((n_drones, 2))
 
-        for i in range(len(original_self_packets)):
-            packet, src_drone, dst_drone, to_send_ts = original_self_packets[i]
+        # drones are listed in the order they were heard for the first time, the relay selections break ties on it
+        self.first_heard = np.full(n_drones, n_drones)
+        self.n_heard = 0
 
-            if to_send_ts == current_ts:  # time to send this packet
-                to_drop_indices.append(i)
+    def update(self, hello_packet):
+        """ store the content of a hello message """
+        src_id = hello_packet.src_drone.identifier
+        if self.last_seen[src_id] == -np.inf:
+            self.first_heard[src_id] = self.n_heard
+            self.n_heard += 1
 
-                if src_drone.identifier != dst_drone.identifier:
-                    drones_distance = util.euclidean_distance(src_drone.coords, dst_drone.coords)
-                    if drones_distance <= min(src_drone.communication_range, dst_drone.communication_range):
+        self.last_seen[src_id] = hello_packet.time_step_creation
+        self.positions[src_id] = hello_packet.cur_pos
+        self.speeds[src_id] = hello_packet.speed
+        self.next_targets[src_id] = hello_packet.next_target
 
-                        if dst_drone.routing_algorithm.channel_success(drones_distance, no_error=True):
+    def valid_mask(self, cur_step, max_age):
+        """ True for the drones whose most recent hello message is not older than max_age steps """
+        return self.last_seen >= cur_step - max_age
 
-                            dst_drone.routing_algorithm.drone_reception(src_drone, packet, current_ts) # reception of a packet
+    def valid_ids(self, cur_step, max_age):
+        """ the identifiers of the drones with a valid hello message, in the order they were first heard """
+        ids = np.flatnonzero(self.valid_mask(cur_step, max_age))
+        return ids[np.argsort(self.first_heard[ids])]
 
-        original_self_packets = [original_self_packets[i] for i in range(len(original_self_packets)) if i not in to_drop_indices]
-        self.packets = original_self_packets + self.packets
\ No newline at end of file
+    def distances_to(self, ids, point):
+        """ the distances between the advertised positions of the drones in ids and the point """
+        deltas = self.positions[ids] - point
+        return np.sqrt(deltas[:, 0] ** 2 + deltas[:, 1] ** 2)
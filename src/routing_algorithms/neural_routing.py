@@ -0,0 +1,140 @@
+from src.utilities import config  # first, so that this file can run as a script
+from src.routing_algorithms.BASE_routing import BASE_routing
+from src.entities.uav_entities import Drone, Packet
+from src.utilities.utilities import euclidean_distance
+from functools import lru_cache
+import numpy as np
+import os
+
+"""
+This file contains the neural routing. A small multilayer perceptron scores every (packet, candidate relay) pair,
+the candidates being the drone itself (i.e., keep the packet) and its neighbors, and each packet goes to the candidate
+with the highest score. All the packets of a drone are scored in a single forward pass, in plain numpy.
+
+The model is a .npz file in config.NN_MODEL_PATH with the weights and the biases of the dense layers, in order
+(relu on the hidden layers, linear output). A Keras model with the same layers is exported with
+np.savez(filename, *model.get_weights()). Run python -m src.routing_algorithms.neural_routing to write the
+model that routes like GEO.
+"""
+
+# the features of a (packet, candidate) pair, in the order the model reads them
+FEATURES = ("candidate_to_depot", "drone_to_candidate", "hello_age", "is_drone", "packet_age", "drone_to_depot")
+
+
+class NeuralRouting(BASE_routing):
+
+    def __init__(self, drone: Drone, simulator):
+        BASE_routing.__init__(self, drone, simulator)
+
+        # the model is read once per process and shared by all the drones
+        self.layers = load_mlp(simulator.parameters.nn_model)
+
+        # the relays chosen for the packets of the buffer, at the time step of the decision
+        self.decision_step = None
+        self.decisions = {}
+
+    def feedback(self, drone, id_event: int, delay: int, outcome: int):
+        """ the model does not learn during the simulation """
+        pass
+
+    def relay_selection(self, opt_neighbors: list, packet: Packet):
+        """
+        This function returns the relay chosen by the model. On the first call of a time step it scores all
+        the packets of the buffer at once, the next calls read the decisions.
+
+        @param opt_neighbors: a list of drones
+        @param packet:
+        @return: The best drone to use as relay or None if the model keeps the packet
+        """
+        cur_step = self.simulator.cur_step
+        if self.decision_step != cur_step:
+            self.decision_step = cur_step
+            self.decisions = self.select_relays(opt_neighbors, self.drone.all_packets(), cur_step)
+
+        return self.decisions.get(packet)
+
+    def select_relays(self, opt_neighbors: list, packets: list, cur_step):
+        """ the relay of each packet (None keeps it), from one forward pass over all the pairs """
+        if len(packets) == 0:
+            return {}
+
+        scores = mlp_forward(self.layers, self.features(opt_neighbors, packets, cur_step))
+        candidates = [None] + opt_neighbors
+        best = np.argmax(scores.reshape(len(packets), len(candidates)), axis=1)
+        return {packet: candidates[c] for packet, c in zip(packets, best.tolist())}
+
+    def features(self, opt_neighbors: list, packets: list, cur_step):
+        """
+        The features of every (packet, candidate) pair, as an array (packets * candidates, len(FEATURES)).
+        The candidates are the drone itself followed by its neighbors, the distances are normalized by the
+        maximum distance from the depot and by the communication range, the ages by their validity.
+        """
+        max_distance = self.simulator.max_dist_drone_depot
+        neighbors_ids = [neighbor.identifier for neighbor in opt_neighbors]
+        drone_to_depot = euclidean_distance(self.drone.coords, self.drone.depot.coords)
+
+        # the features of the candidates, the drone first
+        candidates = np.zeros((len(neighbors_ids) + 1, len(FEATURES)))
+        candidates[0, 0] = drone_to_depot / max_distance
+        candidates[0, 3] = 1
+        candidates[1:, 0] = self.neighbor_table.distances_to(neighbors_ids, self.drone.depot.coords) / max_distance
+        candidates[1:, 1] = (self.neighbor_table.distances_to(neighbors_ids, self.drone.coords)
+                             / self.drone.communication_range)
+        candidates[1:, 2] = (cur_step - self.neighbor_table.last_seen[neighbors_ids]) / self.old_hello_packet
+        candidates[:, 5] = drone_to_depot / max_distance
+
+        # the features of the packets
+        packets_age = np.array([cur_step - packet.event_ref.current_time for packet in packets], dtype=float)
+
+        pairs = np.tile(candidates, (len(packets), 1))
+        pairs[:, 4] = np.repeat(packets_age / self.simulator.event_duration, len(candidates))
+        return pairs
+
+
+def mlp_forward(layers, inputs):
+    """ the outputs of the perceptron for the rows of inputs, relu on the hidden layers and a linear output """
+    outputs = inputs
+    for i, (weights, biases) in enumerate(layers):
+        outputs = outputs @ weights + biases
+        if i < len(layers) - 1:
+            outputs = np.maximum(outputs, 0)
+    return outputs.reshape(len(inputs), -1)[:, 0]
+
+
+@lru_cache(maxsize=None)
+def load_mlp(filename):
+    """
+    Load the dense layers of a perceptron, the arrays of the .npz file are the weights and the biases of
+    the layers in order (e.g., arr_0, arr_1, ... as written by np.savez(filename, *model.get_weights())).
+
+    @param filename: the .npz file of the model
+    @return: a tuple of read-only (weights, biases), one for each layer
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError("no neural routing model at " + filename
+                                + ", run python -m src.routing_algorithms.neural_routing to write the default one")
+
+    with np.load(filename) as model:
+        arrays = [model[name] for name in sorted(model.files, key=lambda name: int(name.split("_")[-1]))]
+
+    assert len(arrays) % 2 == 0 and arrays[0].shape[0] == len(FEATURES), "not a model of the neural routing"
+    for array in arrays:
+        array.flags.writeable = False
+    return tuple(zip(arrays[0::2], arrays[1::2]))
+
+
+def geo_mlp():
+    """
+    The weights of a perceptron that routes like GEO: the score of a candidate is how much closer to the depot
+    it is w.r.t. the drone, i.e., relu(d - c) - relu(c - d), and the drone itself scores 0.
+    """
+    hidden_weights = np.zeros((len(FEATURES), 2))
+    hidden_weights[FEATURES.index("drone_to_depot")] = [1, -1]
+    hidden_weights[FEATURES.index("candidate_to_depot")] = [-1, 1]
+    return [hidden_weights, np.zeros(2), np.array([[1.], [-1.]]), np.zeros(1)]
+
+
+if __name__ == "__main__":
+    os.makedirs(config.NN_MODEL_PATH, exist_ok=True)
+    np.savez(config.NN_MODEL_PATH + config.NN_MODEL_NAME, *geo_mlp())
+    print("Model written to " + config.NN_MODEL_PATH + config.NN_MODEL_NAME)
@@ -16,7 +16,7 @@ class NoneRouting(BASE_routing):
         """
         This function returns a random relay for packets.
 
-        @param opt_neighbors: a list of tuples (hello_packet, drone)
+        @param opt_neighbors: a list of drones
         @return: a random drone as relay
         """
 
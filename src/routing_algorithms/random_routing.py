@@ -10,8 +10,8 @@ class RandomRouting(BASE_routing):
         """
         This function returns a random relay for packets.
 
-        @param opt_neighbors: a list of tuples (hello_packet, drone)
+        @param opt_neighbors: a list of drones
         @return: a random drone as relay
         """
 
-        return self.simulator.rnd_routing.choice([v[1] for v in opt_neighbors] + [None])
+        return self.simulator.rnd_relay.choice(opt_neighbors + [None])
@@ -1,9 +1,7 @@
 from src.routing_algorithms.BASE_routing import BASE_routing
-from src.utilities import utilities as util
 from src.entities.uav_entities import Drone, Packet
 import math
 import numpy as np
-import random
 
 '''
 RULE: all the action values have to be between 0 and 1
@@ -18,9 +16,13 @@ class UCBQLearningRouting(BASE_routing):
     def __init__(self, drone: Drone, simulator):
         BASE_routing.__init__(self, drone=drone, simulator=simulator)
         self.taken_actions = {} # id event : (old_state, old_action)
-        self.q_table = {} # state : [action1, action2, action3, ...]
-        self.ucb_actions = {}
-        
+
+        # a state is the integer id of the cell the drone is in, an action is the identifier of a drone
+        n_cells = simulator.cell_grid.n_cells
+        self.q_table = np.zeros((n_cells, simulator.n_drones)) # state : [action1, action2, action3, ...]
+        self.visited_cells = np.zeros(n_cells, dtype=bool) # whether the q-values of a state have been initialized
+        self.total_selections = np.ones((n_cells, simulator.n_drones), dtype=int) # Had to add 1 to avoid division by 0
+
     def feedback(self, drone: Drone, id_event: int, delay: int, outcome: int):
         """
         Feedback returned when the packet arrives at the depot or
@@ -46,19 +48,12 @@ class UCBQLearningRouting(BASE_routing):
 
             state, chosen_drone, action_step, next_state = self.taken_actions[id_event]
             
-            chosen_q_table = chosen_drone.routing_algorithm.q_table
+            chosen_routing = chosen_drone.routing_algorithm
 
             action = chosen_drone.identifier
             
-            successive_cell_idx = util.TraversedCells.coord_to_cell(size_cell=self.simulator.prob_size_cell,
-                                                       width_area=self.simulator.env_width,
-                                                        x_pos=next_state[0],  
-                                                        y_pos=next_state[1])[0]  
-
-            if successive_cell_idx not in chosen_q_table:
-                state_optimistic_action_values = np.array([random.random() for drones in range(self.simulator.n_drones)])
-                sum_of_values = np.sum(state_optimistic_action_values)
-                chosen_q_table[successive_cell_idx] = state_optimistic_action_values/sum_of_values
+            successive_cell_idx = self.simulator.cell_grid.cell_of(next_state)
+            chosen_routing.init_cell(successive_cell_idx)
 
             # Use the q_learning control algorithm to update the q_table
             q_sa = self.q_table[state][action]
@@ -74,7 +69,7 @@ class UCBQLearningRouting(BASE_routing):
             # compute reward
             reward = self.reward_function(action_step, delay, outcome)
 
-            best_chosen_action_value = np.max(chosen_q_table[successive_cell_idx])
+            best_chosen_action_value = np.max(chosen_routing.q_table[successive_cell_idx])
 
             # update q_table
             self.q_table[state][action] = q_sa + ALPHA*(reward + GAMMA* best_chosen_action_value - q_sa)
@@ -87,46 +82,27 @@ class UCBQLearningRouting(BASE_routing):
         This function returns the best relay to send packets.
 
         @param packet:
-        @param opt_neighbors: a list of tuple (hello_packet, source_drone)
+        @param opt_neighbors: a list of drones
         @return: The best drone to use as relay
         """
 
-        cell_idx = util.TraversedCells.coord_to_cell(size_cell=self.simulator.prob_size_cell,
-                                                       width_area=self.simulator.env_width,
-                                                        x_pos=self.drone.coords[0],  
-                                                        y_pos=self.drone.coords[1])[0]  
-        
-        state, chosen_drone = cell_idx, self.drone
-        # We need to make sure that there are values in the q_table before updating the estimate of each action
-        
-        # If there are neighbors
-        if opt_neighbors is not []:
-            # We need to know the action associated to their state
-            if cell_idx not in self.q_table:
-                state_optimistic_action_values = np.array([random.random() for drones in range(self.simulator.n_drones)])
-                sum_of_values = np.sum(state_optimistic_action_values)
-                self.q_table[cell_idx] = state_optimistic_action_values/sum_of_values
-
-            if cell_idx not in self.ucb_actions:
-                self.ucb_actions[cell_idx] = [Action(drone, cell_idx) for drone in self.simulator.drones]
-
-            max_estimate = self.ucb_actions[cell_idx][self.drone.identifier].update_estimate(self.simulator.cur_step, 
-                self.q_table[cell_idx][self.drone.identifier], C)
-
-            # We must first update each estimate, and to do so we need the current time step and action values
-            for neigh_drone in opt_neighbors:
-                self.ucb_actions[cell_idx][neigh_drone[1].identifier].update_estimate(self.simulator.cur_step, 
-                    self.q_table[cell_idx][neigh_drone[1].identifier], C)
-
-                neigh_action_estimate = self.ucb_actions[cell_idx][neigh_drone[1].identifier].estimate
-                if neigh_action_estimate > max_estimate:
-                    max_estimate = neigh_action_estimate
-                    chosen_drone = neigh_drone[1]
-        
-        action = self.ucb_actions[cell_idx][chosen_drone.identifier]
+        cell_idx = self.simulator.cell_grid.cell_of(self.drone.coords)
         
+        # We need to make sure that there are values in the q_table before computing the estimate of each action
+        self.init_cell(cell_idx)
+
+        # The drone itself comes first, so that it is kept whenever no neighbor has a strictly better estimate
+        candidates = [self.drone] + opt_neighbors
+        candidates_ids = [drone.identifier for drone in candidates]
+
+        # UCB estimate of each candidate, computed with the current time step and action values
+        estimates = self.q_table[cell_idx, candidates_ids] \
+            + np.sqrt(C * math.log(self.simulator.cur_step) / self.total_selections[cell_idx, candidates_ids])
+
+        state, chosen_drone = cell_idx, candidates[int(np.argmax(estimates))]
+
         # We need to remind it how many times it was selected for future ucb estimates
-        action.update_selection_count()
+        self.total_selections[cell_idx, chosen_drone.identifier] += 1
 
         # Store your current action --- you can add some stuff if needed to take a reward later
         # The step when the action was taken to check 
@@ -136,32 +112,10 @@ class UCBQLearningRouting(BASE_routing):
     def reward_function(self, action_step, delay: int, outcome: int):
         # Piu' ti trovi vicino all'esito piu' le tue azioni contano, e piu' le conseguenze sono pesanti (positive/negative reward)
         return (action_step/self.simulator.cur_step)*(self.simulator.event_duration/delay)*outcome
-        
-# Knows about the drone and the state's cell
-# Also keeps track of the estimate for UCB
-class Action:
-
-    def __init__(self, drone: Drone, cell_idx: int):
-        self.id = drone.identifier
-        self.drone = drone
-        self.cell_idx = cell_idx
-        self.total_selections = 1 # Had to add 1 to avoid division by 0
-        self.estimate = 0
-
-    # "cur_step" is the current time step
-    # Everytime the estimate is updated is because we selected the action
-    def update_estimate(self, cur_step: int, action_value: float, c):
-        self.estimate = action_value + math.sqrt(c * math.log(cur_step) / self.total_selections)
-        return self.estimate
-
-    def update_selection_count(self):
-        self.total_selections += 1
-
-    def __hash__(self) -> int:
-        return hash((self.id+self.cell_idx))
-
-    def __eq__(self, other) -> bool:
-        if isinstance(other, Action):
-            return self.id == other.id and self.cell_idx == other.cell_idx
-        return False
 
+    # The first time a state is visited its action values are drawn at random and normalized
+    def init_cell(self, cell_idx: int):
+        if not self.visited_cells[cell_idx]:
+            state_optimistic_action_values = self.simulator.rnd_routing.sample(self.simulator.n_drones)
+            self.q_table[cell_idx] = state_optimistic_action_values/np.sum(state_optimistic_action_values)
+            self.visited_cells[cell_idx] = True
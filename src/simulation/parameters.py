@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+"""
+This file contains the parameters of a simulation that the components (routing, medium, channel) read while the
+simulation runs. They are fixed when the Simulator is built and shared by all its components, so that simulations
+with different parameters can live in the same process.
+"""
+
+
+@dataclass(frozen=True)
+class SimulationParameters:
+    len_simulation: int           # steps of simulation
+    time_step_duration: float     # seconds duration of a step
+    hello_delay: int              # how many time steps wait before transmit again an hello message
+    old_hello_packet: int         # how many time steps an hello message is valid
+    lil_delta: int                # time steps a packet spends in the medium
+    gaussian_scale: float         # scale the success probability of the GAUSSIAN channel
+    path_loss_exponent: float     # path loss exponent of the LOG_DISTANCE channel
+    shadowing_sigma: float        # dB, standard deviation of the shadowing of the LOG_DISTANCE channel
+    medium_channel_error: bool    # whether the medium applies the channel error to the packets it delivers
+    nn_model: str                 # the model file of the NN routing
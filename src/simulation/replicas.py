@@ -0,0 +1,172 @@
+from src.routing_algorithms.net_routing import MediumDispatcher
+from src.utilities import config
+import numpy as np
+
+"""
+This file contains the replica engine. It advances many independent simulations of the same shape (same number of
+drones and duration, e.g., different seeds or routing parameters) in lockstep, in a single process. The routing of
+each replica stays its own, the movement of the drones and the distances of the medium are computed for all the
+replicas at once, over a leading replica dimension.
+
+Each replica gives the same results it gives when run alone, provided its routing only draws from the random
+generators of its own simulator.
+"""
+
+
+class ReplicaEngine:
+
+    def __init__(self, simulators):
+        """
+        @param simulators: the simulators to run in lockstep, already built and not run yet
+        """
+        self.simulators = simulators
+        self.n_drones = simulators[0].n_drones
+        self.len_simulation = simulators[0].len_simulation
+
+        for simulator in simulators:
+            assert simulator.n_drones == self.n_drones, "the replicas must have the same number of drones"
+            assert simulator.len_simulation == self.len_simulation, "the replicas must have the same duration"
+            assert simulator.trace_recorder is None and simulator.trace_replay is None, "traces are not supported"
+            assert not simulator.show_plot and not config.SAVE_PLOT, "plots are not supported"
+            assert self.channel_key(simulator) == self.channel_key(simulators[0]), "the replicas must share the channel"
+
+        # the channel of the first replica gives the probabilities of success of all the replicas,
+        # each replica draws from its own random generator
+        self.channel = simulators[0].channel
+        self.medium_channel_error = simulators[0].parameters.medium_channel_error
+
+        # the tours of the i-th drone of every replica
+        self.trajectories = [TrajectoryBatch([simulator.drones[i].trajectory for simulator in simulators])
+                             for i in range(self.n_drones)]
+
+    def run(self):
+        """ run all the replicas until the end """
+        for cur_step in range(self.len_simulation):
+            for simulator in self.simulators:
+                simulator.cur_step = cur_step
+
+            self.__run_media(cur_step)
+
+            for simulator in self.simulators:
+                simulator.event_generator.handle_events_generation(cur_step, simulator.drones)
+
+            # the drones act in the order of their identifiers, as in Simulator.run
+            for i in range(self.n_drones):
+                for simulator in self.simulators:
+                    drone = simulator.drones[i]
+                    drone.update_packets(cur_step)
+                    drone.routing(simulator.drones, simulator.depot, cur_step)
+                self.__move_drones(i)
+
+            if config.ENABLE_PROBABILITIES:
+                for simulator in self.simulators:
+                    simulator.increase_meetings_probs(simulator.drones, cur_step)
+
+            for simulator in self.simulators:
+                simulator.next_step = cur_step + 1
+
+        # nothing left to simulate, the replicas wrap up as Simulator.run does
+        for simulator in self.simulators:
+            simulator.run_until(self.len_simulation)
+
+        return self.simulators
+
+    @staticmethod
+    def channel_key(simulator):
+        """ what decides the channel of a simulator """
+        return (type(simulator.channel), simulator.drone_com_range, simulator.drone_communication_success,
+                simulator.parameters.gaussian_scale, simulator.parameters.path_loss_exponent,
+                simulator.parameters.shadowing_sigma, simulator.parameters.medium_channel_error)
+
+    def __run_media(self, cur_step):
+        """
+        run the medium of every replica: which packets reach their destination is decided for the packets of all
+        the replicas at once, each replica then delivers its own
+        """
+        all_to_send = [simulator.network_dispatcher.pop_due_packets(cur_step) for simulator in self.simulators]
+        packets = [entry for to_send in all_to_send for entry in to_send]
+        if len(packets) == 0:
+            return
+
+        n_packets = [len(to_send) for to_send in all_to_send]
+        splits = np.cumsum(n_packets)[:-1]
+        drones_distances = MediumDispatcher.distances(packets)
+        ranges = np.array([min(src_drone.communication_range, dst_drone.communication_range)
+                           for _, src_drone, dst_drone, _ in packets])
+        delivered = drones_distances <= ranges
+
+        # the replicas whose contacts are known in advance
+        for simulator, to_send, start in zip(self.simulators, all_to_send, np.concatenate(([0], splits))):
+            if simulator.contact_plan is not None and len(to_send) > 0:
+                delivered[start:start + len(to_send)] = [
+                    simulator.contact_plan.in_contact(src_drone.identifier, dst_drone.identifier, cur_step)
+                    for _, src_drone, dst_drone, _ in to_send]
+
+        if self.medium_channel_error:
+            in_range = np.flatnonzero(delivered)
+            in_range_per_replica = np.bincount(np.repeat(np.arange(len(self.simulators)), n_packets)[in_range],
+                                               minlength=len(self.simulators))
+            draws = np.concatenate([simulator.channel.draws(n)
+                                    for simulator, n in zip(self.simulators, in_range_per_replica.tolist())])
+            delivered[in_range] = draws <= self.channel.success_probability(drones_distances[in_range])
+
+        for simulator, to_send, replica_delivered in zip(self.simulators, all_to_send, np.split(delivered, splits)):
+            if len(to_send) > 0:
+                simulator.network_dispatcher.deliver(to_send, replica_delivered, cur_step)
+
+    def __move_drones(self, i):
+        """ move the i-th drone of every replica, the ones on their mission at once """
+        drones = [simulator.drones[i] for simulator in self.simulators]
+        on_mission = [not drone.move_routing and not drone.last_move_routing and not drone.come_back_to_mission
+                      for drone in drones]
+
+        mission_steps = np.array([drone.mission_step + 1 for drone in drones])
+        positions = self.trajectories[i].positions(mission_steps).tolist()
+
+        for drone, simulator, mission, (x, y) in zip(drones, self.simulators, on_mission, positions):
+            if mission:
+                drone.mission_move((x, y))
+            else:
+                drone.move(simulator.time_step_duration)
+
+
+class TrajectoryBatch:
+    """ Many compiled trajectories (see src.utilities.utilities.Trajectory), each one evaluated at its own step. """
+
+    def __init__(self, trajectories):
+        n_legs = max(len(trajectory.lengths) for trajectory in trajectories)
+        self.periods = np.array([trajectory.period for trajectory in trajectories])
+
+        # the legs of the trajectories one after the other, the arrivals are shifted to be sorted all together
+        self.offsets = np.arange(len(trajectories)) * (np.max(self.periods) + 1)
+        self.arrivals = np.full((len(trajectories), n_legs), np.max(self.periods) + 1)
+        self.departures = np.zeros((len(trajectories), n_legs), dtype=int)
+        self.lengths = np.zeros((len(trajectories), n_legs))
+        self.waypoints = np.zeros((len(trajectories), n_legs, 2))
+        self.targets = np.zeros((len(trajectories), n_legs, 2))
+        self.step_lengths = np.array([trajectory.step_length for trajectory in trajectories])
+
+        for r, trajectory in enumerate(trajectories):
+            legs = len(trajectory.lengths)
+            self.arrivals[r, :legs] = trajectory.arrivals
+            self.departures[r, :legs] = trajectory.departures
+            self.lengths[r, :legs] = trajectory.lengths
+            self.waypoints[r, :legs] = trajectory.waypoints
+            self.targets[r, :legs] = trajectory.targets
+
+        self.arrivals = (self.arrivals + self.offsets[:, None]).ravel()
+        self.departures = self.departures.ravel()
+        self.lengths = self.lengths.ravel()
+        self.waypoints = self.waypoints.reshape(-1, 2)
+        self.targets = self.targets.reshape(-1, 2)
+
+    def positions(self, mission_steps):
+        """ the coordinates on the r-th trajectory at mission_steps[r], as an array (replicas, 2) """
+        steps = np.asarray(mission_steps) % self.periods
+        legs = np.searchsorted(self.arrivals, steps + self.offsets, side="right")
+
+        travelled = (steps - self.departures[legs]) * self.step_lengths
+        lengths = self.lengths[legs]
+        t = np.divide(travelled, lengths, out=np.zeros(len(legs)), where=lengths > 0)[:, None]
+        return (1 - t) * self.waypoints[legs] + t * self.targets[legs]
+
@@ -1,9 +1,14 @@
 from src.drawing import pp_draw
 from src.entities.uav_entities import *
 from src.simulation.metrics import Metrics
+from src.simulation.parameters import SimulationParameters
 from src.utilities import config, utilities
+from src.utilities.contact_plan import ContactPlan
+from src.simulation.traces import TraceRecorder, TraceReplay
+from src.utilities.mobility_cache import MobilityCache
 from src.routing_algorithms.net_routing import MediumDispatcher
 from collections import defaultdict
+from itertools import count
 from tqdm import tqdm
 import numpy as np
 import math
@@ -41,6 +46,16 @@ class Simulator:
                  routing_algorithm=config.ROUTING_ALGORITHM,
                  communication_error_type=config.CHANNEL_ERROR_TYPE,
                  prob_size_cell_r=config.CELL_PROB_SIZE_R,
+                 hello_delay=config.HELLO_DELAY,
+                 old_hello_packet=config.OLD_HELLO_PACKET,
+                 lil_delta=config.LIL_DELTA,
+                 gaussian_scale=config.GUASSIAN_SCALE,
+                 path_loss_exponent=config.PATH_LOSS_EXPONENT,
+                 shadowing_sigma=config.SHADOWING_SIGMA,
+                 medium_channel_error=config.MEDIUM_CHANNEL_ERROR,
+                 nn_model=config.NN_MODEL_PATH + config.NN_MODEL_NAME,
+                 trace_record_path=config.TRACE_RECORD_PATH,
+                 trace_replay_path=config.TRACE_REPLAY_PATH,
                  simulation_name=""):
         self.cur_step = None
         self.drone_com_range = drone_com_range
@@ -66,15 +81,68 @@ class Simulator:
         self.show_plot = show_plot
         self.routing_algorithm = routing_algorithm
         self.communication_error_type = communication_error_type
+        self.trace_record_path = trace_record_path
+        self.trace_replay_path = trace_replay_path
+
+        # the parameters read by the components while the simulation runs
+        self.parameters = SimulationParameters(len_simulation=len_simulation,
+                                               time_step_duration=time_step_duration,
+                                               hello_delay=hello_delay,
+                                               old_hello_packet=old_hello_packet,
+                                               lil_delta=lil_delta,
+                                               gaussian_scale=gaussian_scale,
+                                               path_loss_exponent=path_loss_exponent,
+                                               shadowing_sigma=shadowing_sigma,
+                                               medium_channel_error=medium_channel_error,
+                                               nn_model=nn_model)
 
         # --------------- cell for drones -------------
         self.prob_size_cell_r = prob_size_cell_r
         self.prob_size_cell = int(self.drone_com_range * self.prob_size_cell_r)
-        self.cell_prob_map = defaultdict(lambda: [0, 0, 0])
+        self.cell_grid = utilities.CellGrid(self.prob_size_cell, self.env_width, self.env_height)
+
+        # the assets that do not change between the runs on the same tours, reused by reset
+        self.path_manager = None
+        self.trajectories = {}  # the compiled trajectory of each drone, on the tours of the path manager
+        self.tours_contact_plan = None
+        self.draw_manager = None
+
+        self.__set_run()
+
+    def reset(self, seed=None, routing_algorithm=None, n_drones=None):
+        """
+        Prepare the simulator for a new run, in place. The dynamic state (drones, packets, events, metrics and
+        random generators) starts over, the immutable assets (the parsed tours, the compiled trajectories, the
+        contact plan, the channel tables and the drawer) are reused whenever the new run can share them.
+
+        @param seed: the seed of the new run, None keeps the current one
+        @param routing_algorithm: the routing algorithm of the new run, None keeps the current one
+        @param n_drones: the number of drones of the new run, None keeps the current one
+        @return: the simulator itself
+        """
+        if seed is not None:
+            self.seed = seed
+        if routing_algorithm is not None:
+            self.routing_algorithm = routing_algorithm
+        if n_drones is not None:
+            self.n_drones = n_drones
+
+        self.__set_run()
+        return self
+
+    def __set_run(self):
+        """ the method sets up the dynamic state of a run """
+        self.cur_step = None
+        self.next_step = 0  # the first time step not simulated yet
+        self.ended = False
+        self.cell_prob_map = utilities.CellMeetingsMap(self.cell_grid)
 
         self.sim_save_file = config.SAVE_PLOT_DIR + self.__sim_name()
         self.path_to_depot = None
 
+        # dense identifiers of the entities created during the simulation, one counter for each kind of entity
+        self.identifiers = defaultdict(count)
+
         # Setup vari
         # for stats
         self.metrics = Metrics(self)
@@ -90,10 +158,13 @@ class Simulator:
         self.simulation_test_dir = self.simulation_name + "/"
 
         self.start = time.time()
-        self.event_generator = utilities.EventGenerator(self)
+        if self.trace_replay is None:
+            self.event_generator = utilities.EventGenerator(self)
+        else:  # the events come from the trace
+            self.event_generator = self.trace_replay
 
     def __setup_net_dispatcher(self):
-        self.network_dispatcher = MediumDispatcher(self.metrics)
+        self.network_dispatcher = MediumDispatcher(self.metrics, self)
 
     def __set_metrics(self):
         """ the method sets up all the parameters in the metrics class """
@@ -102,7 +173,8 @@ class Simulator:
     def __set_random_generators(self):
         if self.seed is not None:
             self.rnd_network = np.random.RandomState(self.seed)
-            self.rnd_routing = np.random.RandomState(self.seed)
+            self.rnd_routing = utilities.BufferedRandom(self.seed)
+            self.rnd_relay = np.random.RandomState(self.seed)  # the random relays of RND, apart from the other draws
             self.rnd_env = np.random.RandomState(self.seed)
             self.rnd_event = np.random.RandomState(self.seed)
 
@@ -111,7 +183,14 @@ class Simulator:
 
         self.__set_random_generators()
 
-        self.path_manager = utilities.PathManager(config.PATH_FROM_JSON, config.JSONS_PATH_PREFIX, self.seed)
+        # the channel model is chosen once, for all the drones
+        self.channel = self.communication_error_type.value(self)
+
+        # the tours are loaded again only if they depend on the seed
+        if self.path_manager is None or not self.path_manager.same_tours(self.seed):
+            self.path_manager = utilities.PathManager(config.PATH_FROM_JSON, config.JSONS_PATH_PREFIX, self.seed)
+            self.trajectories = {}
+            self.tours_contact_plan = None
         self.environment = Environment(self.env_width, self.env_height, self)
 
         self.depot = Depot(self.depot_coordinates, self.depot_com_range, self)
@@ -123,13 +202,44 @@ class Simulator:
             self.drones.append(Drone(i, self.path_manager.path(i, self), self.depot, self))
 
         self.environment.add_drones(self.drones)
+
+        # the positions on the mission, shared with the other simulations on the same tours
+        self.mobility_cache = None
+        if config.MOBILITY_CACHE_DIR is not None:
+            self.mobility_cache = MobilityCache(config.MOBILITY_CACHE_DIR, self, self.path_manager.tours_source(self))
+
+        # the drones never leave their tours, their contacts are known in advance
+        self.contact_plan = None
+        if config.CONTACT_PLAN and self.routing_algorithm.name in ("GEO", "RND", "NONE"):
+            if self.tours_contact_plan is None or self.tours_contact_plan.n_drones != self.n_drones:
+                self.tours_contact_plan = ContactPlan(self.drones, self.len_simulation + 1)
+            self.contact_plan = self.tours_contact_plan
+
+        # record the world of this simulation, or replay a recorded one
+        self.trace_recorder = TraceRecorder(self) if self.trace_record_path is not None else None
+        self.trace_replay = None
+        if self.trace_replay_path is not None:
+            self.trace_replay = TraceReplay(self.trace_replay_path, self)
+            self.contact_plan = self.trace_replay  # the contacts come from the trace
         self.environment.add_depot(self.depot)
 
         # Set the maximum distance between the drones and the depot
         self.max_dist_drone_depot = utilities.euclidean_distance(self.depot.coords, (self.env_width, self.env_height))
 
-        if self.show_plot or config.SAVE_PLOT:
+        if (self.show_plot or config.SAVE_PLOT) and self.draw_manager is None:
             self.draw_manager = pp_draw.PathPlanningDrawer(self.environment, self, borders=True)
+        elif self.draw_manager is not None:
+            self.draw_manager.keep_indictor.clear()
+
+    def trajectory(self, drone_id, path):
+        """ the compiled trajectory of the tour of the drone, compiled once for all the runs on the same tours """
+        if drone_id not in self.trajectories:
+            self.trajectories[drone_id] = utilities.Trajectory(path, self.time_step_duration * self.drone_speed)
+        return self.trajectories[drone_id]
+
+    def new_identifier(self, kind):
+        """ return the next identifier for an entity of the given kind (e.g., "event", "packet") """
+        return next(self.identifiers[kind])
 
     def __sim_name(self):
         """
@@ -168,65 +278,108 @@ class Simulator:
 
     def increase_meetings_probs(self, drones, cur_step):
         """ Increases the probabilities of meeting someone. """
-        cells = set()
-        for drone in drones:
-            coords = drone.coords
-            cell_index = utilities.TraversedCells.coord_to_cell(size_cell=self.prob_size_cell,
-                                                                width_area=self.env_width,
-                                                                x_pos=coords[0],  # e.g. 1500
-                                                                y_pos=coords[1])  # e.g. 500
-            cells.add(int(cell_index[0]))
+        self.cell_prob_map.update([drone.coords for drone in drones], cur_step)
 
-        for cell, cell_center in utilities.TraversedCells.all_centers(self.env_width, self.env_height,
-                                                                      self.prob_size_cell):
+    def run(self):
+        """
+        Simulator main function
+        @return: None
+        """
 
-            index_cell = int(cell[0])
-            old_vals = self.cell_prob_map[index_cell]
+        for cur_step in tqdm(range(self.next_step, self.len_simulation)):
+            self.__step(cur_step)
 
-            if index_cell in cells:
-                old_vals[0] += 1
+        self.__end()
 
-            old_vals[1] = cur_step + 1
-            old_vals[2] = old_vals[0] / max(1, old_vals[1])
-            self.cell_prob_map[index_cell] = old_vals
+    def step(self, n=1):
+        """
+        Simulate the next n time steps, or the ones left if they are fewer. The state of the simulation (drones,
+        depot, metrics) can be inspected and changed between two calls.
 
-    def run(self):
+        @param n: the number of time steps to simulate
+        @return: true if the simulation is over
         """
-        Simulator main function
-        @return: None
+        return self.run_until(self.next_step + n)
+
+    def run_until(self, step):
+        """
+        Simulate up to the given time step, excluded, or up to the end of the simulation.
+
+        @param step: the first time step not to simulate
+        @return: true if the simulation is over
+        """
+        for cur_step in range(self.next_step, min(step, self.len_simulation)):
+            self.__step(cur_step)
+
+        if self.is_over():
+            self.__end()
+        return self.is_over()
+
+    def steps(self, every=1):
         """
+        Simulate up to the end, as a generator: it gives back the control after every 'every' time steps
+        and at the end of the simulation.
+
+        @param every: the number of time steps to simulate between two yields
+        @return: a generator of the first time step not simulated yet
+        """
+        while not self.is_over():
+            self.step(every)
+            yield self.next_step
+
+    def is_over(self):
+        """ return true if all the time steps of the simulation have been simulated """
+        return self.next_step >= self.len_simulation
 
-        for cur_step in tqdm(range(self.len_simulation)):
-            
-            self.cur_step = cur_step
-            # check for new events and remove the expired ones from the environment
-            # self.environment.update_events(cur_step)
-            # sense the area and move drones and sense the area
-            self.network_dispatcher.run_medium(cur_step)
-
-            # generates events
-            # sense the events
-            self.event_generator.handle_events_generation(cur_step, self.drones)
-
-            for drone in self.drones:
-                # 1. update expired packets on drone buffers
-                # 2. try routing packets vs other drones or depot
-                # 3. actually move the drone towards next waypoint or depot
-
-                drone.update_packets(cur_step)
-                drone.routing(self.drones, self.depot, cur_step)
+    def __step(self, cur_step):
+        """ simulate the time step cur_step """
+        self.cur_step = cur_step
+        if self.trace_recorder is not None:
+            self.trace_recorder.record_step(self.drones)
+
+        # check for new events and remove the expired ones from the environment
+        # self.environment.update_events(cur_step)
+        # sense the area and move drones and sense the area
+        self.network_dispatcher.run_medium(cur_step)
+
+        # generates events
+        # sense the events
+        self.event_generator.handle_events_generation(cur_step, self.drones)
+
+        for drone in self.drones:
+            # 1. update expired packets on drone buffers
+            # 2. try routing packets vs other drones or depot
+            # 3. actually move the drone towards next waypoint or depot
+
+            drone.update_packets(cur_step)
+            drone.routing(self.drones, self.depot, cur_step)
+            if self.trace_replay is None:
                 drone.move(self.time_step_duration)
+            else:
+                drone.mission_move(self.trace_replay.position(cur_step + 1, drone.identifier))
 
-            # in case we need probability map
-            if config.ENABLE_PROBABILITIES:
-                self.increase_meetings_probs(self.drones, cur_step)
+        # in case we need probability map
+        if config.ENABLE_PROBABILITIES:
+            self.increase_meetings_probs(self.drones, cur_step)
+
+        if self.show_plot or config.SAVE_PLOT:
+            self.__plot(cur_step)
+
+        self.next_step = cur_step + 1
+
+    def __end(self):
+        """ the method wraps up the simulation, once all the time steps are simulated """
+        if self.ended:
+            return
+        self.ended = True
 
-            if self.show_plot or config.SAVE_PLOT:
-                self.__plot(cur_step)
+        if self.trace_recorder is not None:
+            self.trace_recorder.record_step(self.drones)  # where the drones end up
+            self.trace_recorder.save(self.trace_record_path)
 
         if config.DEBUG:
             print("End of simulation, sim time: " + str(
-                (cur_step + 1) * self.time_step_duration) + " sec, #iteration: " + str(cur_step + 1))
+                self.next_step * self.time_step_duration) + " sec, #iteration: " + str(self.next_step))
 
     def close(self):
         """ do some stuff at the end of simulation"""
@@ -0,0 +1,88 @@
+import numpy as np
+
+"""
+This file contains the contact traces. When the drones never leave their tours, the mobility and the events do not
+depend on the routing. A trace records them once (positions of the drones, which pairs of drones are close enough
+to communicate and which drone feels each event, at each time step), then any routing algorithm can be evaluated on
+the same world by replaying the trace, without simulating the mobility and the event generation again.
+"""
+
+
+class TraceRecorder:
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.pairs = np.triu_indices(simulator.n_drones, 1)  # the pairs (i, j), i < j, in the order of the trace
+
+        self.positions = []  # for each time step, the positions of the drones at the beginning of the step
+        self.contacts = []  # for each time step, the packed bits of the pairs in contact
+        self.event_steps = []
+        self.event_drones = []
+
+    def record_step(self, drones):
+        """ record the positions of the drones and their contacts, before they move """
+        positions = np.array([drone.coords for drone in drones], dtype=float)
+        ranges = np.array([drone.communication_range for drone in drones])
+
+        deltas = positions[self.pairs[0]] - positions[self.pairs[1]]
+        distances = np.sqrt(deltas[:, 0] ** 2 + deltas[:, 1] ** 2)
+        in_contact = distances <= np.minimum(ranges[self.pairs[0]], ranges[self.pairs[1]])
+
+        self.positions.append(positions)
+        self.contacts.append(np.packbits(in_contact))
+
+    def record_event(self, cur_step, drone_index):
+        """ record that the drone drone_index feels an event at cur_step """
+        self.event_steps.append(cur_step)
+        self.event_drones.append(drone_index)
+
+    def save(self, filename):
+        np.savez_compressed(filename,
+                            positions=np.array(self.positions),
+                            contacts=np.array(self.contacts, dtype=np.uint8),
+                            event_steps=np.array(self.event_steps, dtype=int),
+                            event_drones=np.array(self.event_drones, dtype=int),
+                            n_drones=self.simulator.n_drones,
+                            seed=self.simulator.seed)
+
+
+class TraceReplay:
+    """
+    Drives a simulation from a recorded trace: it stands for the event generator of the simulator and for its
+    contact plan (see src.utilities.contact_plan.ContactPlan), the drones take their positions from it.
+    """
+
+    def __init__(self, filename, simulator):
+        trace = np.load(filename)
+        assert int(trace["n_drones"]) == simulator.n_drones, "the trace was recorded with another number of drones"
+        assert len(trace["positions"]) > simulator.len_simulation, "the trace is shorter than the simulation"
+
+        self.positions = trace["positions"]
+        n_pairs = simulator.n_drones * (simulator.n_drones - 1) // 2
+        self.contacts = np.unpackbits(trace["contacts"], axis=1, count=n_pairs).astype(bool)
+
+        # the column of each pair of drones in the contacts
+        self.pair_index = np.full((simulator.n_drones, simulator.n_drones), -1, dtype=int)
+        rows, cols = np.triu_indices(simulator.n_drones, 1)
+        self.pair_index[rows, cols] = self.pair_index[cols, rows] = np.arange(n_pairs)
+
+        # the drones feeling an event, for each time step
+        self.events = {}
+        for cur_step, drone_index in zip(trace["event_steps"].tolist(), trace["event_drones"].tolist()):
+            self.events.setdefault(cur_step, []).append(drone_index)
+
+    def position(self, cur_step, drone_id):
+        """ the position of the drone at the beginning of cur_step """
+        x, y = self.positions[cur_step, drone_id].tolist()
+        return x, y
+
+    def in_contact(self, drone_id, other_id, cur_step):
+        """ return true if the two drones are close enough to communicate at the given time step """
+        if drone_id == other_id:
+            return False
+        return bool(self.contacts[cur_step, self.pair_index[drone_id, other_id]])
+
+    def handle_events_generation(self, cur_step: int, drones: list):
+        """ the recorded drones feel an event at cur_step """
+        for drone_index in self.events.get(cur_step, []):
+            drones[drone_index].feel_event(cur_step)
@@ -0,0 +1,164 @@
+from src.simulation.simulator import Simulator
+from src.utilities import config
+import multiprocessing
+import numpy as np
+
+"""
+This file contains the environments to train routing policies outside of the simulator, with a Gym-like interface.
+Every drone is an agent: at each decision (every drone_retransmission_delta time steps, when the drones choose the
+relays of their packets) it observes its neighbor table and its buffer, and it chooses the identifier of the drone to
+relay its packets to (-1 keeps them). A drone is rewarded 1 for each packet it decided on that reaches the depot and
+-1 for each one that expires (see src.routing_algorithms.external_routing).
+
+RoutingEnv wraps a single simulation. VectorRoutingEnv runs many of them in worker processes, with batched reset and
+step: the observations, the rewards and the dones gain a leading dimension, one entry per environment.
+"""
+
+
+class RoutingEnv:
+
+    def __init__(self, seed=config.SEED, **simulator_args):
+        """
+        @param seed: the seed of the first episode
+        @param simulator_args: the other arguments of the Simulator (e.g., n_drones, len_simulation)
+        """
+        self.simulator = Simulator(seed=seed, show_plot=False, routing_algorithm=config.RoutingAlgorithm.EXT,
+                                   **simulator_args)
+        self.decision_interval = self.simulator.drone_retransmission_delta
+
+    def reset(self, seed=None):
+        """
+        Start a new episode, on the same simulator.
+
+        @param seed: the seed of the episode, None keeps the current one
+        @return: the first observation
+        """
+        self.simulator.reset(seed=seed, routing_algorithm=config.RoutingAlgorithm.EXT)
+        return self.observe()
+
+    def step(self, actions):
+        """
+        Apply the relay choices of the drones and simulate up to the next decision.
+
+        @param actions: for each drone, the identifier of the relay of its packets, -1 to keep them
+        @return: (observation, rewards of the drones, done, info)
+        """
+        for drone, action in zip(self.simulator.drones, actions):
+            drone.routing_algorithm.action = None if action < 0 else int(action)
+
+        done = self.simulator.step(self.decision_interval)
+
+        info = {"cur_step": self.simulator.next_step,
+                "packets_to_depot": len(self.simulator.metrics.drones_packets_to_depot)}
+        return self.observe(), self.collect_rewards(), done, info
+
+    def observe(self):
+        """
+        The observation of every drone, as a dictionary of arrays:
+            neighbors (drones, drones, 3): for each other drone, whether its hello message is still valid, the
+                distance to its advertised position and the distance of its advertised position to the depot
+            buffers (drones, 2): the number of packets in the buffer and the distance to the depot
+        """
+        simulator = self.simulator
+        depot_coords = np.array(simulator.depot.coords)
+        neighbors = np.zeros((simulator.n_drones, simulator.n_drones, 3))
+        buffers = np.zeros((simulator.n_drones, 2))
+
+        for drone in simulator.drones:
+            table = drone.routing_algorithm.neighbor_table
+            valid = table.valid_mask(simulator.next_step, simulator.parameters.old_hello_packet)
+            ids = np.arange(simulator.n_drones)
+
+            neighbors[drone.identifier, :, 0] = valid
+            neighbors[drone.identifier, :, 1] = np.where(valid, table.distances_to(ids, drone.coords), 0)
+            neighbors[drone.identifier, :, 2] = np.where(valid, table.distances_to(ids, depot_coords), 0)
+
+            delta = depot_coords - drone.coords
+            buffers[drone.identifier] = drone.buffer_length(), np.sqrt(delta[0] ** 2 + delta[1] ** 2)
+
+        return {"neighbors": neighbors, "buffers": buffers}
+
+    def collect_rewards(self):
+        """ the rewards of the drones since the last collection """
+        rewards = np.array([drone.routing_algorithm.reward for drone in self.simulator.drones], dtype=float)
+        for drone in self.simulator.drones:
+            drone.routing_algorithm.reward = 0
+        return rewards
+
+
+class VectorRoutingEnv:
+
+    def __init__(self, seeds, **simulator_args):
+        """
+        @param seeds: the seeds of the first episodes, one environment (and worker process) for each seed
+        @param simulator_args: the other arguments of the Simulator, the same for all the environments
+        """
+        self.n_envs = len(seeds)
+        self.remotes = []
+        self.workers = []
+
+        for seed in seeds:
+            remote, worker_remote = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=env_worker,
+                                             args=(worker_remote, seed, self.n_envs, simulator_args), daemon=True)
+            worker.start()
+            worker_remote.close()
+            self.remotes.append(remote)
+            self.workers.append(worker)
+
+    def reset(self, seeds=None):
+        """
+        Start a new episode in every environment.
+
+        @param seeds: the seeds of the episodes, None keeps the current ones
+        @return: the batched first observations
+        """
+        seeds = [None] * self.n_envs if seeds is None else seeds
+        for remote, seed in zip(self.remotes, seeds):
+            remote.send(("reset", seed))
+        return stack_observations([remote.recv() for remote in self.remotes])
+
+    def step(self, actions):
+        """
+        Step every environment, the ones whose episode ends start a new one with the seed advanced by the number of
+        environments (the last observation of the ended episode is in info["final_observation"]).
+
+        @param actions: (envs, drones) the relay choices of the drones of every environment
+        @return: (batched observations, rewards (envs, drones), dones (envs,), infos)
+        """
+        for remote, env_actions in zip(self.remotes, actions):
+            remote.send(("step", env_actions))
+        results = [remote.recv() for remote in self.remotes]
+
+        observations, rewards, dones, infos = zip(*results)
+        return stack_observations(observations), np.stack(rewards), np.array(dones), list(infos)
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for worker in self.workers:
+            worker.join()
+
+
+def stack_observations(observations):
+    """ the observations of many environments, as a dictionary of arrays with a leading environment dimension """
+    return {key: np.stack([observation[key] for observation in observations]) for key in observations[0]}
+
+
+def env_worker(remote, seed, n_envs, simulator_args):
+    """ the loop of a worker process, it runs the commands of the VectorRoutingEnv on its own environment """
+    env = RoutingEnv(seed, **simulator_args)
+
+    while True:
+        command, data = remote.recv()
+        if command == "reset":
+            remote.send(env.reset(data))
+        elif command == "step":
+            observation, rewards, done, info = env.step(data)
+            if done:
+                info["final_observation"] = observation
+                observation = env.reset(env.simulator.seed + n_envs)
+            remote.send((observation, rewards, done, info))
+        elif command == "close":
+            remote.close()
+            break
@@ -5,6 +5,9 @@ from src.routing_algorithms.distance_based_q_learning_routing import DistanceBas
 from src.routing_algorithms.ucb_q_learning_routing import UCBQLearningRouting
 from src.routing_algorithms.none_routing import NoneRouting
 from src.routing_algorithms.random_routing import RandomRouting
+from src.routing_algorithms.external_routing import ExternalRouting
+from src.routing_algorithms.neural_routing import NeuralRouting
+from src.routing_algorithms.channel import UniformChannel, GaussianChannel, NoErrorChannel, LogDistanceChannel
 from enum import Enum
 
 """
@@ -90,25 +93,32 @@ class RoutingAlgorithm(Enum):
     FEQR = FullyEchoedQLearningRouting
     UCBQL = UCBQLearningRouting
     NONE = NoneRouting
+    EXT = ExternalRouting  # the relays are chosen by an external controller, see src.simulation.vector_env
+    NN = NeuralRouting
 
     @staticmethod
     def keylist():
         return list(map(lambda c: c.name, RoutingAlgorithm))
 
 class ChannelError(Enum):
-    UNIFORM = 1
-    GAUSSIAN = 2
-    NO_ERROR = 3
+    UNIFORM = UniformChannel
+    GAUSSIAN = GaussianChannel
+    NO_ERROR = NoErrorChannel
+    LOG_DISTANCE = LogDistanceChannel
     
     @staticmethod
     def keylist():
         return list(map(lambda c: c.name, ChannelError))
 
 ROUTING_ALGORITHM = RoutingAlgorithm.FEQR
-CHANNEL_ERROR_TYPE = ChannelError.GAUSSIAN
+CHANNEL_ERROR_TYPE = ChannelError.GAUSSIAN  # the channel model, applied by the medium if MEDIUM_CHANNEL_ERROR
 
 COMMUNICATION_P_SUCCESS = 1   # float: probability to have success in a communication.
 GUASSIAN_SCALE = .9            # float [0,1]: scale the error probability of the guassian -> success * GUASSIAN_SCALER
+PATH_LOSS_EXPONENT = 2.7       # float: path loss exponent of the LOG_DISTANCE channel (2 in free space).
+SHADOWING_SIGMA = 4            # float: dB, standard deviation of the shadowing of the LOG_DISTANCE channel.
+MEDIUM_CHANNEL_ERROR = False   # bool: whether the medium applies the channel error to the packets it delivers.
+CONTACT_PLAN = False           # bool: precompute the contacts between the drones (GEO, RND, NONE only), the medium reads them.
 PACKETS_MAX_TTL = 200         # float: threshold in the maximum number of hops. Causes loss of packets.
 RETRANSMISSION_DELAY = 10     # int: how many time steps to wait before transmit again (for k retransmissions). # ---  #delta_k
 
@@ -120,7 +130,13 @@ OLD_HELLO_PACKET = 50
 
 ROOT_EVALUATION_DATA = "data/evaluation_tests/"
 
+# ------------------------------------------- CONTACT TRACES --------------------------------- #
+TRACE_RECORD_PATH = None   # str: if set, record the mobility, the contacts and the events of the simulation there (.npz)
+TRACE_REPLAY_PATH = None   # str: if set, replay a recorded trace instead of simulating the mobility and the events
+MOBILITY_CACHE_DIR = None  # str: if set, the positions of the drones on their mission are cached there and memory-mapped
+
 NN_MODEL_PATH = "data/nnmodels/"
+NN_MODEL_NAME = "relay_mlp.npz"  # str: the model of the NN routing (see src.routing_algorithms.neural_routing)
 
 # --------------- new cell probabilities -------------- #
 CELL_PROB_SIZE_R = 1.875  # the percentage of cell size with respect to drone com range
@@ -0,0 +1,137 @@
+from bisect import bisect_right
+import numpy as np
+
+"""
+This file contains the contact plan: the time steps on which each pair of drones is close enough to communicate,
+computed once from the compiled trajectories (see src.utilities.utilities.Trajectory) of drones that never leave
+their tours. Between two consecutive leg changes, of either drone, the positions of both drones are linear in the
+time step, hence the squared distance is a quadratic in the time step and the contact steps come from its roots.
+"""
+
+
+class ContactPlan:
+
+    def __init__(self, drones, horizon):
+        """
+        @param drones: the drones, each one with its compiled trajectory
+        @param horizon: the number of time steps to plan
+        """
+        self.n_drones = len(drones)
+        self.horizon = horizon
+
+        # for each pair (i, j) with i < j, the start (inclusive) and the end (exclusive) steps of the contacts
+        self.windows = {}
+        self.__starts = {}
+        self.__ends = {}
+
+        for i in range(self.n_drones):
+            for j in range(i + 1, self.n_drones):
+                communication_range = min(drones[i].communication_range, drones[j].communication_range)
+                windows = pair_contact_windows(drones[i].trajectory, drones[j].trajectory,
+                                               communication_range, horizon)
+                self.windows[i, j] = windows
+                self.__starts[i, j] = windows[:, 0].tolist()
+                self.__ends[i, j] = windows[:, 1].tolist()
+
+    def in_contact(self, drone_id, other_id, cur_step):
+        """ return true if the two drones are close enough to communicate at the given time step """
+        if drone_id == other_id:
+            return False
+        pair = (drone_id, other_id) if drone_id < other_id else (other_id, drone_id)
+
+        window = bisect_right(self.__starts[pair], cur_step) - 1
+        return window >= 0 and cur_step < self.__ends[pair][window]
+
+    def neighbors(self, drone_id, cur_step):
+        """ the identifiers of the drones close enough to communicate with the given one at the given time step """
+        return [other_id for other_id in range(self.n_drones) if self.in_contact(drone_id, other_id, cur_step)]
+
+    # --- STATISTICS ---
+    def contact_durations(self):
+        """ the duration, in time steps, of every contact """
+        return np.concatenate([windows[:, 1] - windows[:, 0] for windows in self.windows.values()] + [[]])
+
+    def inter_contact_times(self):
+        """ the time steps between the end of a contact and the start of the next one of the same pair """
+        return np.concatenate([windows[1:, 0] - windows[:-1, 1] for windows in self.windows.values()] + [[]])
+
+    def connectivity(self):
+        """ matrix of the fraction of the horizon each pair of drones spends in contact """
+        matrix = np.zeros((self.n_drones, self.n_drones))
+        for (i, j), windows in self.windows.items():
+            matrix[i, j] = matrix[j, i] = np.sum(windows[:, 1] - windows[:, 0]) / self.horizon
+        return matrix
+
+    def mean_degree(self):
+        """ the average number of drones a drone is in contact with """
+        return np.sum(self.connectivity()) / max(1, self.n_drones)
+
+
+def pair_contact_windows(trajectory, other_trajectory, communication_range, horizon):
+    """
+    Compute the contacts of two drones flying on their tours.
+
+    @param trajectory: the compiled trajectory of the first drone
+    @param other_trajectory: the compiled trajectory of the second drone
+    @param communication_range: the distance within which the two drones communicate
+    @param horizon: the number of time steps to plan
+    @return: an array (n, 2) of [start, end) time steps of the contacts, sorted and disjoint
+    """
+    # the positions are linear in the time step between two consecutive leg changes
+    starts = np.union1d(trajectory.breakpoints(horizon), other_trajectory.breakpoints(horizon))
+    lasts = np.append(starts[1:], horizon) - 1 - starts  # last step of each interval, relative to its start
+
+    position, velocity = trajectory.positions(starts), trajectory.velocities(starts)
+    other_position, other_velocity = other_trajectory.positions(starts), other_trajectory.velocities(starts)
+
+    # sweep: discard the intervals on which the bounding boxes of the two drones are too far apart
+    end_position = position + velocity * lasts[:, None]
+    other_end_position = other_position + other_velocity * lasts[:, None]
+    gap = np.maximum(0, np.maximum(np.minimum(position, end_position) - np.maximum(other_position, other_end_position),
+                                   np.minimum(other_position, other_end_position) - np.maximum(position, end_position)))
+    close = np.flatnonzero(np.sum(gap ** 2, axis=1) <= communication_range ** 2)
+
+    # |a + b t|^2 <= r^2 for t in [0, last]
+    a = position[close] - other_position[close]
+    b = velocity[close] - other_velocity[close]
+    qa = np.sum(b ** 2, axis=1)
+    qb = 2 * np.sum(a * b, axis=1)
+    qc = np.sum(a ** 2, axis=1) - communication_range ** 2
+
+    moving = qa > 0
+    discriminant = np.where(moving, qb ** 2 - 4 * qa * qc, 0)
+    root = np.sqrt(np.maximum(discriminant, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1 = np.where(moving, (-qb - root) / (2 * qa), 0)
+        t2 = np.where(moving, (-qb + root) / (2 * qa), lasts[close])
+
+    lo = np.maximum(0, np.ceil(t1)).astype(int)
+    hi = np.minimum(lasts[close], np.floor(t2)).astype(int)
+    valid = np.where(moving, discriminant >= 0, qc <= 0) & (lo <= hi)
+
+    interval_starts = starts[close][valid]
+    interval_ends = interval_starts + lasts[close][valid] + 1
+    window_starts = interval_starts + lo[valid]
+    window_ends = interval_starts + hi[valid] + 1
+
+    # the roots are exact up to rounding, settle the boundary steps on the positions the simulator computes
+    def within(steps):
+        deltas = trajectory.positions(steps) - other_trajectory.positions(steps)
+        return np.sqrt(deltas[:, 0] ** 2 + deltas[:, 1] ** 2) <= communication_range
+
+    if len(window_starts) > 0:
+        window_starts += ~within(window_starts)
+        window_ends -= ~within(window_ends - 1)
+        window_starts -= (window_starts > interval_starts) & within(np.maximum(window_starts - 1, 0))
+        window_ends += (window_ends < interval_ends) & within(np.minimum(window_ends, horizon - 1))
+
+    keep = window_starts < window_ends
+    window_starts, window_ends = window_starts[keep], window_ends[keep]
+
+    # merge the contacts that go on across a leg change
+    if len(window_starts) == 0:
+        return np.zeros((0, 2), dtype=int)
+    new_contact = np.append(True, window_starts[1:] > window_ends[:-1])
+    merged_starts = window_starts[new_contact]
+    merged_ends = window_ends[np.append(new_contact[1:], True)]
+    return np.stack([merged_starts, merged_ends], axis=1)
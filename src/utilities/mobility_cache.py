@@ -0,0 +1,66 @@
+import hashlib
+import os
+import numpy as np
+
+"""
+This file contains the mobility cache: the positions of the drones on their mission at each time step, computed once
+from the compiled trajectories and stored as a .npy file. Every simulation with the same tours, seed and motion
+parameters (e.g., the workers of a sweep over the routing algorithms) maps the same file in memory, without copying it.
+"""
+
+
+class MobilityCache:
+
+    def __init__(self, cache_dir, simulator, tours_source):
+        """
+        @param cache_dir: the directory of the cache files
+        @param simulator: the simulator, its drones must be already created
+        @param tours_source: where the tours come from (e.g., the json file), part of the key of the cache
+        """
+        self.filename = os.path.join(cache_dir, self.key(simulator, tours_source) + ".npy")
+
+        if not os.path.isfile(self.filename):
+            self.__write(simulator, cache_dir)
+
+        # (steps, drones, 2) positions, mapped read-only and shared with the other processes using the file
+        self.positions = np.load(self.filename, mmap_mode="r")
+
+        # the rows read so far, at most one live step per drone since the drones only move forward on their mission
+        self.rows = {}
+        self.max_rows = simulator.n_drones + 1
+
+    @staticmethod
+    def key(simulator, tours_source):
+        """ the name of the cache file for the tours and the motion parameters of the simulator """
+        parameters = (tours_source, simulator.seed, simulator.n_drones, simulator.drone_speed,
+                      simulator.time_step_duration, simulator.len_simulation)
+        return "mobility_" + hashlib.sha1(repr(parameters).encode()).hexdigest()
+
+    def position(self, mission_step, drone_id):
+        """ the position of the drone after mission_step steps on its mission """
+        row = self.rows.get(mission_step)
+        if row is None:
+            row = self.row(mission_step)
+        return row[drone_id]
+
+    def row(self, mission_step):
+        """ read the positions of all the drones at mission_step at once, the drones on the same step share them """
+        if len(self.rows) >= self.max_rows:
+            del self.rows[next(iter(self.rows))]  # the oldest row
+        row = self.rows[mission_step] = [tuple(position) for position in self.positions[mission_step].tolist()]
+        return row
+
+    def __write(self, simulator, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # write aside and rename, a concurrent worker either finds the whole file or does not find it
+        tmp_filename = self.filename + "." + str(os.getpid()) + ".tmp"
+        positions = np.lib.format.open_memmap(tmp_filename, mode="w+", dtype=float,
+                                              shape=(simulator.len_simulation + 1, simulator.n_drones, 2))
+        mission_steps = np.arange(simulator.len_simulation + 1)
+        for drone in simulator.drones:
+            positions[:, drone.identifier] = drone.trajectory.positions(mission_steps)
+        positions.flush()
+        del positions
+
+        os.replace(tmp_filename, self.filename)
@@ -1,6 +1,7 @@
 import json
 import random
 import math
+import multiprocessing
 import matplotlib.pyplot as plt
 import numpy as np
 from src.utilities import config
@@ -17,22 +18,22 @@ from src.utilities import config
 ## -----------------------------------------------------------------------------                                                                                            
 
 def euclidean_distance(point1, point2):
-    return math.sqrt(math.pow(point2[0] - point1[0], 2)
-                     + math.pow(point2[1] - point1[1], 2))
+    return math.sqrt((point2[0] - point1[0]) ** 2 + (point2[1] - point1[1]) ** 2)
 
 
 def next_target(depot_pos, cur_position, residual_autonomy, edge_area, range_decision, random_generator):
     """ return the next position (x,y) along the next autonomy after reached the point"""
-    if residual_autonomy < min(range_decision) * 1.44 + euclidean_distance(depot_pos, cur_position):
-        return depot_pos, max(0, residual_autonomy - euclidean_distance(cur_position, depot_pos))
+    to_depot = euclidean_distance(cur_position, depot_pos)
+    if residual_autonomy < min(range_decision) * 1.44 + to_depot:
+        return depot_pos, max(0, residual_autonomy - to_depot)
     else:
-        feasible_positions = [d for d in range_decision if
-                              d * 1.44 * 2 + euclidean_distance(cur_position, depot_pos) <= residual_autonomy]
+        feasible_positions = [d for d in range_decision if d * 1.44 * 2 + to_depot <= residual_autonomy]
 
         if len(feasible_positions) == 0:
-            return depot_pos, max(0, residual_autonomy - euclidean_distance(cur_position, depot_pos))
+            return depot_pos, max(0, residual_autonomy - to_depot)
 
-        d = random_generator.choice(feasible_positions)
+        # same draw as random_generator.choice(feasible_positions), without building an array
+        d = feasible_positions[random_generator.randint(0, len(feasible_positions))]
 
         next_point_x = random_generator.randint(max(0, cur_position[0] - d), min(cur_position[0] + d, edge_area))
         next_point_y = random_generator.randint(max(0, cur_position[1] - d), min(cur_position[1] + d, edge_area))
@@ -69,7 +70,6 @@ def get_tour(autonomy, edge_area, depot_pos, random_generator, range_decision=No
 def random_waypoint_tour(ndrones, nrounds, depot, autonomy, edge_area, random_generator):
     drones_tours = {}
     for d in range(ndrones):
-        print(d)
         d_tours = []
         for r in range(nrounds):
             d_tours.append(get_tour(autonomy, edge_area, depot, random_generator=random_generator))
@@ -90,6 +90,11 @@ def random_waypoint_tour(ndrones, nrounds, depot, autonomy, edge_area, random_ge
 def plot_tour(tours):
     pass
 
+
+def flat_tours(tours):
+    """ the rounds of each drone one after the other, as the drone flies them """
+    return {d: [waypoint for d_tour in d_tours for waypoint in d_tour] for d, d_tours in tours.items()}
+
 def to_json(tours, mission_data, seed):
     """ take in input the multiround solution
         and print it to json 
@@ -121,6 +126,15 @@ def to_json(tours, mission_data, seed):
         json.dump(out_json, outfile)
 
 
+def to_npz(tours, seed):
+    """ take in input the multiround solution
+        and store it in the binary tours format, the same tours the json would load
+    """
+    from src.utilities.utilities import paths_to_npz  # utilities imports this module
+    paths_to_npz({d: d_tour + d_tour[-1:] for d, d_tour in tours.items()},
+                 'data/tours/RANDOM_missions' + str(seed) + '.npz')
+
+
 # -----------------------------------------------------------------------------
 #                    __  __            _____  _   _ 
 #                   |  \/  |    /\    |_   _|| \ | |
@@ -132,38 +146,50 @@ def to_json(tours, mission_data, seed):
 ## -----------------------------------------------------------------------------
 def run(ndrones, nrounds, autonomy,
         depot, mission_data, edge_area, seed,
-        plot=True, save=False):
-    print("Number of drones/depots:", ndrones)
-    print("Autonomy:", autonomy)
-    print("Max number of autonomy:", nrounds)
+        plot=True, save=False, save_json=True):
 
     # set seed
     random_generator = np.random.RandomState(seed)
 
     # get tours
-    tours = random_waypoint_tour(ndrones, nrounds, depot, autonomy, edge_area, random_generator=random_generator)
+    tours = flat_tours(random_waypoint_tour(ndrones, nrounds, depot, autonomy, edge_area,
+                                            random_generator=random_generator))
 
     if plot:
         plot_tour(tours)
 
     if save:
-        to_json(tours, mission_data, seed)
+        to_npz(tours, seed)
+        if save_json:
+            to_json(tours, mission_data, seed)
+
+
+def run_seeds(seeds, ndrones, nrounds, autonomy, depot, mission_data, edge_area, save_json=True, processes=None):
+    """ run the generation of the tours for each seed, the seeds are spread across a pool of processes.
+        The tours of a seed only depend on its own random generator, they are the same as a serial run.
+    """
+    with multiprocessing.Pool(processes) as pool:
+        pool.starmap(run, [(ndrones, nrounds, autonomy, depot, mission_data, edge_area, seed, False, True, save_json)
+                           for seed in seeds])
 
 
 "build the json file tours for the routing "
 if __name__ == "__main__":
 
-    for seed in range(0, 50):
-        # mission info
-        depot = (750, 0)
-        nrounds = 1
-        edge_area = 1500
-        aut = 100000  # meters in our simulation use at least 60000
-        ndrones = 90
-        mission_data = {
-            "ndrones": str(ndrones),
-            "autonomy_meters": str(aut),
-            "edge_area": str(edge_area)
-        }
-        # save = True -> create the json file with the path
-        run(ndrones, nrounds, aut, depot, mission_data, edge_area, seed, plot=False, save=True)
+    # mission info
+    depot = (750, 0)
+    nrounds = 1
+    edge_area = 1500
+    aut = 100000  # meters in our simulation use at least 60000
+    ndrones = 90
+    mission_data = {
+        "ndrones": str(ndrones),
+        "autonomy_meters": str(aut),
+        "edge_area": str(edge_area)
+    }
+    print("Number of drones/depots:", ndrones)
+    print("Autonomy:", aut)
+    print("Max number of autonomy:", nrounds)
+
+    # create the json and the binary tours of each seed
+    run_seeds(range(0, 50), ndrones, nrounds, aut, depot, mission_data, edge_area)
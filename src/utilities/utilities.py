@@ -6,7 +6,9 @@ import json
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import math
 import pickle
+from bisect import bisect_right
 from ast import literal_eval as make_tuple
 from src.utilities import random_waypoint_generation
 
@@ -67,6 +69,49 @@ def projection_on_line_between_points(p1, p2, p3):
     # p1=d_0, p2=D, p3=d_i
     return euclidean_distance(p1, p3) * np.cos(angle_between_points(p1, p2, p3))
 
+# ------------------ Random stream ----------------------
+class BufferedRandom:
+
+    def __init__(self, seed, block_size=4096):
+        """
+        Hands out uniform random numbers in [0, 1) drawn in blocks from a numpy RandomState.
+        The numbers are the same that consecutive RandomState(seed).rand() calls would return.
+
+        :param seed: the seed of the underlying RandomState
+        :param block_size: how many numbers are drawn at once
+        """
+        self.random_state = np.random.RandomState(seed)
+        self.block_size = block_size
+        self.__refill()
+
+    def __refill(self):
+        self.block = self.random_state.rand(self.block_size).tolist()
+        self.index = 0
+
+    def rand(self):
+        """ return the next uniform random number in [0, 1) """
+        if self.index == self.block_size:
+            self.__refill()
+        value = self.block[self.index]
+        self.index += 1
+        return value
+
+    def sample(self, size):
+        """ return the next size uniform random numbers in [0, 1), as an array """
+        values = []
+        while len(values) < size:
+            if self.index == self.block_size:
+                self.__refill()
+            taken = self.block[self.index:self.index + size - len(values)]
+            self.index += len(taken)
+            values += taken
+        return np.array(values)
+
+    def choice(self, options: list):
+        """ return an element of options chosen uniformly at random """
+        return options[int(self.rand() * len(options))]
+
+
 # ------------------ Event (Traffic) Generator ----------------------
 class EventGenerator:
 
@@ -90,6 +135,8 @@ class EventGenerator:
         if cur_step % self.simulator.event_generation_delay == 0:  # if it's time to generate a new packet
             # drone that will receive the packet:
             drone_index = self.rnd_drones.randint(0, len(drones))
+            if self.simulator.trace_recorder is not None:
+                self.simulator.trace_recorder.record_event(cur_step, drone_index)
             drone = drones[drone_index]
             drone.feel_event(cur_step)
 
@@ -104,12 +151,25 @@ class PathManager:
             We assume json_file.format(seed)
         """
         self.path_from_json = path_from_json
+        self.json_prefix = json_file
         self.json_file = json_file.format(seed)
         if path_from_json:
-            self.path_dict = json_to_paths(self.json_file)
+            # the binary tours beside the json file, if they have been converted (see json_to_npz)
+            npz_file = pathlib.Path(self.json_file).with_suffix(".npz")
+            json_file = pathlib.Path(self.json_file)
+            if (npz_file.is_file() and json_file.is_file()
+                    and json_file.stat().st_mtime_ns > npz_file.stat().st_mtime_ns):
+                # the json was written after the conversion, the binary tours are stale
+                json_to_npz(self.json_file, str(npz_file))
+            self.tours_file = str(npz_file) if npz_file.is_file() else self.json_file  # the file the tours are read from
+            if npz_file.is_file():
+                self.path_dict = npz_to_paths(npz_file)
+            else:
+                self.path_dict = json_to_paths(self.json_file)
             self.rnd_paths = None
         else:
             self.path_dict = None
+            self.tours_file = None
             self.rnd_paths = np.random.RandomState(seed)
 
     def path(self, drone_id, simulator):
@@ -134,6 +194,26 @@ class PathManager:
                                                        range_decision=config.RANDOM_STEPS,
                                                        random_starting_point=config.RANDOM_START_POINT)
 
+    def same_tours(self, seed):
+        """ whether the tours for the given seed are the ones of this manager, i.e., they need not be loaded again """
+        if config.DEMO_PATH or config.CIRCLE_PATH:
+            return True
+        return self.path_from_json and self.json_file == self.json_prefix.format(seed)
+
+    def tours_source(self, simulator):
+        """ describes where the tours come from, the same description gives the same tours """
+        if config.DEMO_PATH:
+            return "demo"
+        if config.CIRCLE_PATH:
+            return "circle", simulator.depot_coordinates, simulator.depot_com_range
+        elif self.path_from_json:
+            # a file written again at the same path gives other tours
+            stat = pathlib.Path(self.tours_file).stat()
+            return "json", self.tours_file, stat.st_size, stat.st_mtime_ns
+        else:
+            return ("generated", simulator.drone_max_energy, simulator.env_width, simulator.depot_coordinates,
+                    config.RANDOM_STEPS, config.RANDOM_START_POINT)
+
     def __cirlce_path(self, drone_id, simulator, center=None, radius=None):
         if center is None:
             center = simulator.depot_coordinates
@@ -157,6 +237,86 @@ class PathManager:
 # [(-100, 0.0), (-99, 14.106735979665885), (-98, 19.8997487421324), (-97, 24.310491562286437), (-96, 28.0), (-95, 31.22498999199199), (-94, 34.11744421846396), (-93, 36.75595189897821), (-92, 39.191835884530846), (-91, 41.46082488325576), (-90, 43.58898943540674), (-89, 45.59605246071199), (-88, 47.49736834815167), (-87, 49.3051721424842), (-86, 51.02940328869229), (-85, 52.67826876426369), (-84, 54.258639865002145), (-83, 55.776339069537364), (-82, 57.23635208501674), (-81, 58.642987645583), (-80, 60.0), (-79, 61.310684223877324), (-78, 62.57795138864806), (-77, 63.80438856379708), (-76, 64.99230723708769), (-75, 66.14378277661477), (-74, 67.26068688320095), (-73, 68.3447144993671), (-72, 69.39740629158989), (-71, 70.42016756583301), (-70, 71.4142842854285), (-69, 72.38093671679029), (-68, 73.32121111929344), (-67, 74.23610981186985), (-66, 75.1265598839718), (-65, 75.99342076785332), (-64, 76.83749084919418), (-63, 77.6595132614157), (-62, 78.46018098373213), (-61, 79.24014134263012), (-60, 80.0), (-59, 80.7403244977378), (-58, 81.4616474176652), (-57, 82.16446920658588), (-56, 82.84926070883192), (-55, 83.51646544245033), (-54, 84.16650165000326), (-53, 84.79976415061542), (-52, 85.41662601625049), (-51, 86.01744009211156), (-50, 86.60254037844386), (-49, 87.17224328879004), (-48, 87.72684879784524), (-47, 88.26664149042944), (-46, 88.79189152169245), (-45, 89.30285549745876), (-44, 89.7997772825746), (-43, 90.28288874421332), (-42, 90.75241043630741), (-41, 91.20855223058855), (-40, 91.6515138991168), (-39, 92.08148565265441), (-38, 92.49864863877742), (-37, 92.90317540321213), (-36, 93.29523031752481), (-35, 93.67496997597597), (-34, 94.04254356406997), (-33, 94.39809320108114), (-32, 94.74175425861608), (-31, 95.07365565707464), (-30, 95.39392014169457), (-29, 95.7026645397086), (-28, 96.0), (-27, 96.28603221651622), (-26, 96.56086163658648), (-25, 96.82458365518542), (-24, 97.07728879609277), (-23, 97.31906288081488), (-22, 97.54998718605759), (-21, 97.77013859047148), (-20, 97.97958971132712), (-19, 98.17840903172143), (-18, 98.3666610188635), (-17, 98.54440623394105), (-16, 98.71170143402453), (-15, 98.86859966642594), (-14, 99.0151503558925), (-13, 99.15139938498095), (-12, 99.27738916792686), (-11, 99.39315871829409), (-10, 99.498743710662), (-9, 99.5941765365827), (-8, 99.67948635501689), (-7, 99.75469913743412), (-6, 99.81983770774224), (-5, 99.87492177719089), (-4, 99.91996797437437), (-3, 99.95498987044118), (-2, 99.9799979995999), (-1, 99.99499987499375), (0, 100.0), (1, 99.99499987499375), (2, 99.9799979995999), (3, 99.95498987044118), (4, 99.91996797437437), (5, 99.87492177719089), (6, 99.81983770774224), (7, 99.75469913743412), (8, 99.67948635501689), (9, 99.5941765365827), (10, 99.498743710662), (11, 99.39315871829409), (12, 99.27738916792686), (13, 99.15139938498095), (14, 99.0151503558925), (15, 98.86859966642594), (16, 98.71170143402453), (17, 98.54440623394105), (18, 98.3666610188635), (19, 98.17840903172143), (20, 97.97958971132712), (21, 97.77013859047148), (22, 97.54998718605759), (23, 97.31906288081488), (24, 97.07728879609277), (25, 96.82458365518542), (26, 96.56086163658648), (27, 96.28603221651622), (28, 96.0), (29, 95.7026645397086), (30, 95.39392014169457), (31, 95.07365565707464), (32, 94.74175425861608), (33, 94.39809320108114), (34, 94.04254356406997), (35, 93.67496997597597), (36, 93.29523031752481), (37, 92.90317540321213), (38, 92.49864863877742), (39, 92.08148565265441), (40, 91.6515138991168), (41, 91.20855223058855), (42, 90.75241043630741), (43, 90.28288874421332), (44, 89.7997772825746), (45, 89.30285549745876), (46, 88.79189152169245), (47, 88.26664149042944), (48, 87.72684879784524), (49, 87.17224328879004), (50, 86.60254037844386), (51, 86.01744009211156), (52, 85.41662601625049), (53, 84.79976415061542), (54, 84.16650165000326), (55, 83.51646544245033), (56, 82.84926070883192), (57, 82.16446920658588), (58, 81.4616474176652), (59, 80.7403244977378), (60, 80.0), (61, 79.24014134263012), (62, 78.46018098373213), (63, 77.6595132614157), (64, 76.83749084919418), (65, 75.99342076785332), (66, 75.1265598839718), (67, 74.23610981186985), (68, 73.32121111929344), (69, 72.38093671679029), (70, 71.4142842854285), (71, 70.42016756583301), (72, 69.39740629158989), (73, 68.3447144993671), (74, 67.26068688320095), (75, 66.14378277661477), (76, 64.99230723708769), (77, 63.80438856379708), (78, 62.57795138864806), (79, 61.310684223877324), (80, 60.0), (81, 58.642987645583), (82, 57.23635208501674), (83, 55.776339069537364), (84, 54.258639865002145), (85, 52.67826876426369), (86, 51.02940328869229), (87, 49.3051721424842), (88, 47.49736834815167), (89, 45.59605246071199), (90, 43.58898943540674), (91, 41.46082488325576), (92, 39.191835884530846), (93, 36.75595189897821), (94, 34.11744421846396), (95, 31.22498999199199), (96, 28.0), (97, 24.310491562286437), (98, 19.8997487421324), (99, 14.106735979665885), (99, -14.106735979665885), (98, -19.8997487421324), (97, -24.310491562286437), (96, -28.0), (95, -31.22498999199199), (94, -34.11744421846396), (93, -36.75595189897821), (92, -39.191835884530846), (91, -41.46082488325576), (90, -43.58898943540674), (89, -45.59605246071199), (88, -47.49736834815167), (87, -49.3051721424842), (86, -51.02940328869229), (85, -52.67826876426369), (84, -54.258639865002145), (83, -55.776339069537364), (82, -57.23635208501674), (81, -58.642987645583), (80, -60.0), (79, -61.310684223877324), (78, -62.57795138864806), (77, -63.80438856379708), (76, -64.99230723708769), (75, -66.14378277661477), (74, -67.26068688320095), (73, -68.3447144993671), (72, -69.39740629158989), (71, -70.42016756583301), (70, -71.4142842854285), (69, -72.38093671679029), (68, -73.32121111929344), (67, -74.23610981186985), (66, -75.1265598839718), (65, -75.99342076785332), (64, -76.83749084919418), (63, -77.6595132614157), (62, -78.46018098373213), (61, -79.24014134263012), (60, -80.0), (59, -80.7403244977378), (58, -81.4616474176652), (57, -82.16446920658588), (56, -82.84926070883192), (55, -83.51646544245033), (54, -84.16650165000326), (53, -84.79976415061542), (52, -85.41662601625049), (51, -86.01744009211156), (50, -86.60254037844386), (49, -87.17224328879004), (48, -87.72684879784524), (47, -88.26664149042944), (46, -88.79189152169245), (45, -89.30285549745876), (44, -89.7997772825746), (43, -90.28288874421332), (42, -90.75241043630741), (41, -91.20855223058855), (40, -91.6515138991168), (39, -92.08148565265441), (38, -92.49864863877742), (37, -92.90317540321213), (36, -93.29523031752481), (35, -93.67496997597597), (34, -94.04254356406997), (33, -94.39809320108114), (32, -94.74175425861608), (31, -95.07365565707464), (30, -95.39392014169457), (29, -95.7026645397086), (28, -96.0), (27, -96.28603221651622), (26, -96.56086163658648), (25, -96.82458365518542), (24, -97.07728879609277), (23, -97.31906288081488), (22, -97.54998718605759), (21, -97.77013859047148), (20, -97.97958971132712), (19, -98.17840903172143), (18, -98.3666610188635), (17, -98.54440623394105), (16, -98.71170143402453), (15, -98.86859966642594), (14, -99.0151503558925), (13, -99.15139938498095), (12, -99.27738916792686), (11, -99.39315871829409), (10, -99.498743710662), (9, -99.5941765365827), (8, -99.67948635501689), (7, -99.75469913743412), (6, -99.81983770774224), (5, -99.87492177719089), (4, -99.91996797437437), (3, -99.95498987044118), (2, -99.9799979995999), (1, -99.99499987499375), (0, -100.0), (-1, -99.99499987499375), (-2, -99.9799979995999), (-3, -99.95498987044118), (-4, -99.91996797437437), (-5, -99.87492177719089), (-6, -99.81983770774224), (-7, -99.75469913743412), (-8, -99.67948635501689), (-9, -99.5941765365827), (-10, -99.498743710662), (-11, -99.39315871829409), (-12, -99.27738916792686), (-13, -99.15139938498095), (-14, -99.0151503558925), (-15, -98.86859966642594), (-16, -98.71170143402453), (-17, -98.54440623394105), (-18, -98.3666610188635), (-19, -98.17840903172143), (-20, -97.97958971132712), (-21, -97.77013859047148), (-22, -97.54998718605759), (-23, -97.31906288081488), (-24, -97.07728879609277), (-25, -96.82458365518542), (-26, -96.56086163658648), (-27, -96.28603221651622), (-28, -96.0), (-29, -95.7026645397086), (-30, -95.39392014169457), (-31, -95.07365565707464), (-32, -94.74175425861608), (-33, -94.39809320108114), (-34, -94.04254356406997), (-35, -93.67496997597597), (-36, -93.29523031752481), (-37, -92.90317540321213), (-38, -92.49864863877742), (-39, -92.08148565265441), (-40, -91.6515138991168), (-41, -91.20855223058855), (-42, -90.75241043630741), (-43, -90.28288874421332), (-44, -89.7997772825746), (-45, -89.30285549745876), (-46, -88.79189152169245), (-47, -88.26664149042944), (-48, -87.72684879784524), (-49, -87.17224328879004), (-50, -86.60254037844386), (-51, -86.01744009211156), (-52, -85.41662601625049), (-53, -84.79976415061542), (-54, -84.16650165000326), (-55, -83.51646544245033), (-56, -82.84926070883192), (-57, -82.16446920658588), (-58, -81.4616474176652), (-59, -80.7403244977378), (-60, -80.0), (-61, -79.24014134263012), (-62, -78.46018098373213), (-63, -77.6595132614157), (-64, -76.83749084919418), (-65, -75.99342076785332), (-66, -75.1265598839718), (-67, -74.23610981186985), (-68, -73.32121111929344), (-69, -72.38093671679029), (-70, -71.4142842854285), (-71, -70.42016756583301), (-72, -69.39740629158989), (-73, -68.3447144993671), (-74, -67.26068688320095), (-75, -66.14378277661477), (-76, -64.99230723708769), (-77, -63.80438856379708), (-78, -62.57795138864806), (-79, -61.310684223877324), (-80, -60.0), (-81, -58.642987645583), (-82, -57.23635208501674), (-83, -55.776339069537364), (-84, -54.258639865002145), (-85, -52.67826876426369), (-86, -51.02940328869229), (-87, -49.3051721424842), (-88, -47.49736834815167), (-89, -45.59605246071199), (-90, -43.58898943540674), (-91, -41.46082488325576), (-92, -39.191835884530846), (-93, -36.75595189897821), (-94, -34.11744421846396), (-95, -31.22498999199199), (-96, -28.0), (-97, -24.310491562286437), (-98, -19.8997487421324), (-99, -14.106735979665885), (-100, -0.0)],
 
 
+class Trajectory:
+    """
+    A tour compiled into arrays, to get the position of a drone on its mission at any time step without
+    simulating the movement step by step. The tour is closed: after the last waypoint the drone goes back to the first.
+    Each leg ends exactly on its waypoint, the drone never covers two legs in the same time step.
+    """
+
+    def __init__(self, path: list, step_length: float):
+        """
+        @param path: the list of waypoints of the tour
+        @param step_length: the distance the drone covers in a time step (speed * time step duration)
+        """
+        self.waypoints = np.array(path, dtype=float)
+        self.targets = np.roll(self.waypoints, -1, axis=0)  # leg i goes from waypoint i to waypoint i + 1
+        self.step_length = step_length
+
+        self.lengths = np.sqrt(np.sum((self.targets - self.waypoints) ** 2, axis=1))
+        self.cum_lengths = np.concatenate(([0], np.cumsum(self.lengths)))  # arc length at the start of each leg
+
+        if step_length > 0:
+            steps = np.maximum(1, np.ceil(self.lengths / step_length)).astype(int)
+        else:
+            steps = np.ones(len(self.lengths), dtype=int)
+        self.arrivals = np.cumsum(steps)  # mission step on which each leg is completed
+        self.departures = self.arrivals - steps  # mission step on which each leg starts
+        self.period = int(self.arrivals[-1])
+
+        # python copies, the scalar lookups are faster on lists
+        self.__arrivals = self.arrivals.tolist()
+        self.__departures = self.departures.tolist()
+        self.__lengths = self.lengths.tolist()
+        self.__path = [tuple(waypoint) for waypoint in path]
+
+    def leg(self, mission_step):
+        """ the index of the leg the drone is flying on at the given mission step """
+        return bisect_right(self.__arrivals, mission_step % self.period)
+
+    def position(self, mission_step):
+        """ the coordinates of the drone at the given mission step """
+        mission_step %= self.period
+        i = bisect_right(self.__arrivals, mission_step)
+
+        travelled = (mission_step - self.__departures[i]) * self.step_length
+        length = self.__lengths[i]
+        if travelled == 0 or length == 0:
+            return self.__path[i]
+
+        t = travelled / length
+        p0, p1 = self.__path[i], self.__path[(i + 1) % len(self.__path)]
+        return ((1 - t) * p0[0] + t * p1[0]), ((1 - t) * p0[1] + t * p1[1])
+
+    def next_target(self, mission_step):
+        """ the waypoint the drone is flying to at the given mission step """
+        return self.__path[(self.leg(mission_step) + 1) % len(self.__path)]
+
+    def velocities(self, mission_steps):
+        """ the displacement of the drone in one step, on the leg it is flying at each of the given mission steps """
+        legs = np.searchsorted(self.arrivals, np.asarray(mission_steps) % self.period, side="right")
+
+        lengths = self.lengths[legs]
+        scale = np.divide(self.step_length, lengths, out=np.zeros(len(legs)), where=lengths > 0)[:, None]
+        return (self.targets[legs] - self.waypoints[legs]) * scale
+
+    def breakpoints(self, horizon):
+        """ the mission steps before horizon on which the drone starts a new leg """
+        laps = [self.departures + lap * self.period for lap in range(int(math.ceil(horizon / self.period)))]
+        steps = np.concatenate(laps)
+        return steps[steps < horizon]
+
+    def positions(self, mission_steps):
+        """ the coordinates of the drone at each of the given mission steps, as an array (n, 2) """
+        mission_steps = np.asarray(mission_steps) % self.period
+        legs = np.searchsorted(self.arrivals, mission_steps, side="right")
+
+        travelled = (mission_steps - self.departures[legs]) * self.step_length
+        lengths = self.lengths[legs]
+        t = np.divide(travelled, lengths, out=np.zeros(len(legs)), where=lengths > 0)[:, None]
+        return (1 - t) * self.waypoints[legs] + t * self.targets[legs]
+
+
 def json_to_paths(json_file_path):
     """ load the tour for drones
         and return a dictionary {drone_id : list of waypoint}
@@ -182,6 +342,34 @@ def json_to_paths(json_file_path):
             out_data[drone_index] = drone_path
     return out_data
 
+def paths_to_npz(paths, npz_file_path):
+    """ store the tours {drone_id : list of waypoint} in the binary format:
+        the waypoints of all the drones one after the other in coords (n, 2), the tour of the i-th drone in
+        indices is coords[offsets[i]:offsets[i + 1]]
+    """
+    indices = sorted(paths.keys())
+    lengths = [len(paths[drone_index]) for drone_index in indices]
+    coords = np.array([waypoint for drone_index in indices for waypoint in paths[drone_index]]).reshape(-1, 2)
+    np.savez(npz_file_path, indices=np.array(indices, dtype=int),
+             offsets=np.concatenate(([0], np.cumsum(lengths))).astype(int), coords=coords)
+
+
+def npz_to_paths(npz_file_path):
+    """ load the tours stored by paths_to_npz and return a dictionary {drone_id : list of waypoint} """
+    with np.load(npz_file_path) as data:
+        indices, offsets, coords = data["indices"].tolist(), data["offsets"].tolist(), data["coords"].tolist()
+    return {drone_index: [tuple(waypoint) for waypoint in coords[offsets[i]:offsets[i + 1]]]
+            for i, drone_index in enumerate(indices)}
+
+
+def json_to_npz(json_file_path, npz_file_path=None):
+    """ convert a json tours file to the binary format, by default stored beside it with the .npz extension """
+    if npz_file_path is None:
+        npz_file_path = str(pathlib.Path(json_file_path).with_suffix(".npz"))
+    paths_to_npz(json_to_paths(json_file_path), npz_file_path)
+    return npz_file_path
+
+
 def clean_paths(json_file_path):
 
     out_data = {"drones":[]}
@@ -277,92 +465,160 @@ def measure_scaler(measure, dom_start, dom_target):
 
 # -------------------- all cells computation ---------------------#
 
-class TraversedCells:
+class CellGrid:
+    """
+    The grid of square cells of the area, a cell is identified by an integer: the cells are numbered by rows,
+    starting from the lower left corner (inside the area, the same numbering of TraversedCells.coord_to_cell).
+    """
 
-    @staticmethod
-    def cells_in_travel(size_cell, width_area, start, end):
-        """ return the cell number in which the pos (x, y) lay """
+    def __init__(self, size_cell, width_area, height_area):
+        self.size_cell = size_cell
+        self.width_area = width_area
+        self.height_area = height_area
+        self.columns = int(math.ceil(width_area / size_cell))
+        self.rows = int(math.ceil(height_area / size_cell))
+        self.n_cells = self.columns * self.rows
+
+    def cell_of(self, coords) -> int:
+        """ the cell in which the position (x, y) lies, a position out of the area (or on its right or upper
+            border) counts in the closest cell of the area
+        """
+        column = min(max(int(coords[0] // self.size_cell), 0), self.columns - 1)
+        row = min(max(int(coords[1] // self.size_cell), 0), self.rows - 1)
+        return column + self.columns * row
 
-        start_cell, coords_cell_start = TraversedCells.coord_to_cell(size_cell, width_area, start[0],
-                                                                     start[1])  # int, lower left coordinates
-        end_cell, coords_cell_end = TraversedCells.coord_to_cell(size_cell, width_area, end[0], end[1])
+    def cells_of(self, coords) -> np.ndarray:
+        """ the cells in which the positions, an array (n, 2), lie (see cell_of) """
+        coords = np.asarray(coords)
+        columns = np.clip((coords[:, 0] // self.size_cell).astype(int), 0, self.columns - 1)
+        rows = np.clip((coords[:, 1] // self.size_cell).astype(int), 0, self.rows - 1)
+        return columns + self.columns * rows
 
-        out_cells = []
+    def cell_coords(self, cell):
+        """ the column and the row of the cell """
+        return cell % self.columns, cell // self.columns
 
-        if coords_cell_end[1] == coords_cell_start[1]:  # vertical alignment
-            min_x = min(coords_cell_start[0], coords_cell_end[0])
-            max_x = max(coords_cell_start[0], coords_cell_end[0])
-            for x_ in range(min_x, max_x + 1):
-                out_cells.append((x_, coords_cell_end[1]))
-            return out_cells
+    def centers(self) -> np.ndarray:
+        """ the centers of the cells of the area, an array (columns * rows, 2) indexed by cell """
+        columns, rows = self.cell_coords(np.arange(self.n_cells))
+        return np.stack([columns, rows], axis=1) * self.size_cell + self.size_cell / 2.0
 
-        if coords_cell_end[0] == coords_cell_start[0]:  # horizontal alignment
-            min_y = min(coords_cell_start[1], coords_cell_end[1])
-            max_y = max(coords_cell_start[1], coords_cell_end[1])
-            for y_ in range(min_y, max_y + 1):
-                out_cells.append((coords_cell_end[0], y_))
-            return out_cells
 
-        # Diagonal line
-        # Boundaries of the rectangle
-        min_x, max_x = min(coords_cell_start[0], coords_cell_end[0]), max(coords_cell_start[0], coords_cell_end[0])
-        min_y, max_y = min(coords_cell_start[1], coords_cell_end[1]), max(coords_cell_start[1], coords_cell_end[1])
+class CellMeetingsMap:
+    """ For each cell of the grid, the fraction of the time steps in which at least a drone was in it. """
 
-        # All the cells of the rectangle, indices
-        coords_index = [(i, j) for i in range(min_x, max_x + 1) for j in range(min_y, max_y + 1)]
-        for cell in coords_index:
+    def __init__(self, cell_grid: CellGrid):
+        self.cell_grid = cell_grid
+        self.meetings = np.zeros(cell_grid.n_cells, dtype=int)  # time steps with at least a drone in the cell
+        self.steps = 0
 
-            ll = cell[0] * size_cell, cell[1] * size_cell
-            lr = cell[0] * size_cell + size_cell, cell[1] * size_cell
-            ul = cell[0] * size_cell, cell[1] * size_cell + size_cell
-            ur = cell[0] * size_cell + size_cell, cell[1] * size_cell + size_cell
+    def update(self, drones_coords, cur_step):
+        """ count the cells in which the drones are at cur_step """
+        cells = self.cell_grid.cells_of(drones_coords)
+        self.meetings += np.bincount(cells, minlength=len(self.meetings)) > 0
+        self.steps = cur_step + 1
 
-            if TraversedCells.intersect_quad(start, end, ll, lr, ul, ur):
-                out_cells.append(cell)
+    def probability(self, cell):
+        """ the probability of meeting a drone in the cell """
+        return self.meetings[cell] / max(1, self.steps)
 
-        return out_cells  # list of lower-lefts
+    def probabilities(self) -> np.ndarray:
+        """ the probability of meeting a drone in each cell """
+        return self.meetings / max(1, self.steps)
 
-    @staticmethod
-    def intersect_quad(start, end, ll, lr, ul, ur):
 
-        return (TraversedCells.intersect_segments(start, end, ll, lr)
-                or TraversedCells.intersect_segments(start, end, ul, ur)
-                or TraversedCells.intersect_segments(start, end, ul, ll)
-                or TraversedCells.intersect_segments(start, end, lr, ur))
+class TraversedCells:
 
     @staticmethod
-    def intersect_segments(start1: tuple, end1: tuple, start2: tuple, end2: tuple):
-        if end1 == start2:
-            return True
-        if end2 == start1:
-            return True
-        if start2 == start1:
-            return True
-        if end2 == end1:
-            return True
-
-        a = np.asarray(end1) - np.asarray(start1)  # direction of line a
-        b = np.asarray(start2) - np.asarray(end2)  # direction of line b, reversed
-        d = np.asarray(start2) - np.asarray(start1)  # right-hand side
-        det = a[0] * b[1] - a[1] * b[0]
+    def cells_in_travel(size_cell, width_area, start, end):
+        """ return the cells (x, y) crossed by the segment from start to end, in the order they are crossed.
+            It walks the grid (Amanatides-Woo), the cost is linear in the number of crossed cells.
+        """
+        x, y = TraversedCells.coord_to_cell(size_cell, width_area, start[0], start[1])[1]
+        end_x, end_y = TraversedCells.coord_to_cell(size_cell, width_area, end[0], end[1])[1]
+        step_x, t_max_x, t_delta_x = TraversedCells.__walk_axis(size_cell, x, start[0], end[0])
+        step_y, t_max_y, t_delta_y = TraversedCells.__walk_axis(size_cell, y, start[1], end[1])
+
+        out_cells = [(x, y)]
+        while x != end_x or y != end_y:
+            # cross the closest grid line, never walk past the cell of the end
+            if x != end_x and y != end_y and t_max_x == t_max_y:
+                # through a corner of the grid: the two cells touching it are crossed as well
+                out_cells += [(x + step_x, y), (x, y + step_y)]
+                x += step_x
+                y += step_y
+                t_max_x += t_delta_x
+                t_max_y += t_delta_y
+            elif y == end_y or (x != end_x and t_max_x < t_max_y):
+                x += step_x
+                t_max_x += t_delta_x
+            else:
+                y += step_y
+                t_max_y += t_delta_y
+            out_cells.append((x, y))
+
+        return out_cells
 
-        if det == 0:
-            return False
+    @staticmethod
+    def cells_in_travels(size_cell, starts, ends):
+        """ the batch version of cells_in_travel, it walks all the segments at once
 
-        t = (a[0] * d[1] - a[1] * d[0]) / det
-        return 0 <= t <= 1
+            starts, ends : arrays (n, 2), the i-th segment goes from starts[i] to ends[i]
+            return two arrays: the segment of each crossed cell, and the cells (x, y) as an array (m, 2),
+            the cells of a segment are contiguous and in the order they are crossed
+        """
+        starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+        cells = (starts / size_cell).astype(int)
+        end_cells = (ends / size_cell).astype(int)
+
+        deltas = ends - starts
+        steps = np.where(deltas > 0, 1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_max = np.where(deltas != 0, ((cells + (steps > 0)) * size_cell - starts) / deltas, np.inf)
+            t_delta = np.where(deltas != 0, size_cell / np.abs(deltas), np.inf)
+
+        segments_out, cells_out = [np.arange(len(starts))], [cells.copy()]
+        active = np.flatnonzero(np.any(cells != end_cells, axis=1))
+        while len(active) > 0:
+            cur, end = cells[active], end_cells[active]
+            move_x = (cur[:, 1] == end[:, 1]) | ((cur[:, 0] != end[:, 0])
+                                                 & (t_max[active, 0] < t_max[active, 1]))
+            axis = np.where(move_x, 0, 1)
+
+            # through a corner of the grid: the two cells touching it are crossed as well (see cells_in_travel)
+            corner = np.all(cur != end, axis=1) & (t_max[active, 0] == t_max[active, 1])
+            if np.any(corner):
+                cornered = active[corner]
+                for touched_axis in (0, 1):
+                    touched = cells[cornered].copy()
+                    touched[:, touched_axis] += steps[cornered, touched_axis]
+                    segments_out.append(cornered)
+                    cells_out.append(touched)
+                cells[cornered, 0] += steps[cornered, 0]
+                t_max[cornered, 0] += t_delta[cornered, 0]
+
+            cells[active, axis] += steps[active, axis]
+            t_max[active, axis] += t_delta[active, axis]
+            segments_out.append(active)
+            cells_out.append(cells[active].copy())
+
+            active = active[np.any(cells[active] != end_cells[active], axis=1)]
+
+        segments_out, cells_out = np.concatenate(segments_out), np.concatenate(cells_out)
+        order = np.argsort(segments_out, kind="stable")
+        return segments_out[order], cells_out[order]
 
     @staticmethod
-    def all_centers(widht_area, height_area, size_cell):
-        """ return all cell along their centers """
-        all_cells_and_centers = []
-        for x in range(0, widht_area, size_cell):
-            for y in range(0, height_area, size_cell):
-                all_cells_and_centers.append(
-                    (TraversedCells.coord_to_cell(size_cell, widht_area, x, y),
-                     (x + (size_cell / 2.0), y + (size_cell / 2.0)))
-                )
-        return all_cells_and_centers
+    def __walk_axis(size_cell, cell, start, end):
+        """ the direction of the walk along an axis, the position (in fraction of the segment) of the
+            first grid line crossed and the distance between two grid lines
+        """
+        delta = end - start
+        if delta == 0:
+            return 0, math.inf, math.inf
+        step = 1 if delta > 0 else -1
+        next_line = (cell + 1 if step > 0 else cell) * size_cell
+        return step, (next_line - start) / delta, size_cell / abs(delta)
 
     @staticmethod
     def coord_to_cell(size_cell, width_area, x_pos, y_pos):
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# the config first, it imports the routing algorithms (see src.utilities.config)
+from src.utilities import config  # noqa: E402
+from src.simulation.simulator import Simulator  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    """ the paths in the config (e.g., the tours) are relative to the root of the repository """
+    monkeypatch.chdir(ROOT)
+
+
+def metrics_summary(simulator):
+    """ the metrics of a simulation that two equivalent runs must share """
+    metrics = simulator.metrics
+    metrics.other_metrics()
+    return (metrics.number_of_generated_events, metrics.number_of_events_to_depot,
+            metrics.number_of_packets_to_depot, str(metrics.packet_mean_delivery_time),
+            metrics.all_control_packets_in_simulation, metrics.all_data_packets_in_simulation,
+            str(np.nanmean(metrics.mean_numbers_of_possible_relays)))
+
+
+def new_simulator(routing_algorithm="GEO", len_simulation=2000, **simulator_args):
+    """ a small simulation without plots, the global generators seeded as in a fresh process """
+    np.random.seed(0)
+    random.seed(0)
+    simulator_args.setdefault("n_drones", 10)
+    simulator_args.setdefault("seed", 10)
+    return Simulator(len_simulation=len_simulation, show_plot=False,
+                     routing_algorithm=config.RoutingAlgorithm[routing_algorithm], **simulator_args)
+
+
+@pytest.fixture
+def simulate():
+    """ run a small simulation to the end, return its metrics summary """
+    def run(routing_algorithm="GEO", len_simulation=2000, **simulator_args):
+        simulator = new_simulator(routing_algorithm, len_simulation, **simulator_args)
+        simulator.run()
+        return metrics_summary(simulator)
+    return run
+
+
+@pytest.fixture
+def make_simulator():
+    """ build a small simulation, to drive by hand """
+    return new_simulator
+
+
+@pytest.fixture
+def summarize():
+    """ the metrics summary of a simulation driven by hand """
+    return metrics_summary
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from src.utilities import config
+from src.utilities.contact_plan import ContactPlan
+
+
+def test_contacts_are_the_brute_force_ones(make_simulator):
+    simulator = make_simulator(len_simulation=3000)
+    horizon = simulator.len_simulation + 1
+    plan = ContactPlan(simulator.drones, horizon)
+
+    steps = np.arange(horizon)
+    positions = np.stack([drone.trajectory.positions(steps) for drone in simulator.drones])
+
+    for (i, j), windows in plan.windows.items():
+        deltas = positions[i] - positions[j]
+        expected = np.sqrt(deltas[:, 0] ** 2 + deltas[:, 1] ** 2) <= min(simulator.drones[i].communication_range,
+                                                                         simulator.drones[j].communication_range)
+        in_windows = np.zeros(horizon, dtype=bool)
+        for start, end in windows:
+            in_windows[start:end] = True
+
+        assert np.array_equal(in_windows, expected)
+        assert [plan.in_contact(j, i, step) for step in steps.tolist()] == expected.tolist()
+
+    assert sum(len(windows) for windows in plan.windows.values()) > 0
+    for step in [0, 1, 1500, 3000]:
+        for drone_id in range(simulator.n_drones):
+            assert plan.neighbors(drone_id, step) == [other_id for other_id in range(simulator.n_drones)
+                                                      if plan.in_contact(other_id, drone_id, step)]
+
+
+@pytest.mark.parametrize("routing_algorithm", ["GEO", "RND", "NONE"])
+def test_contact_plan_same_simulation(simulate, monkeypatch, routing_algorithm):
+    expected = simulate(routing_algorithm)
+
+    monkeypatch.setattr(config, "CONTACT_PLAN", True)
+    assert simulate(routing_algorithm) == expected
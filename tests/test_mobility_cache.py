@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from src.utilities import config
+
+
+@pytest.mark.parametrize("routing_algorithm", ["GEO", "QL"])
+def test_cached_mobility_same_simulation(simulate, tmp_path, monkeypatch, routing_algorithm):
+    expected = simulate(routing_algorithm)
+
+    monkeypatch.setattr(config, "MOBILITY_CACHE_DIR", str(tmp_path))
+    assert simulate(routing_algorithm) == expected  # writes the cache
+    assert simulate(routing_algorithm) == expected  # reads it
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+
+def test_cached_positions_are_the_trajectories(make_simulator, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MOBILITY_CACHE_DIR", str(tmp_path))
+    simulator = make_simulator(len_simulation=500)
+    cache = simulator.mobility_cache
+
+    for mission_step in [0, 1, 250, 500, 3, 499]:
+        for drone in simulator.drones:
+            assert cache.position(mission_step, drone.identifier) == \
+                tuple(np.asarray(drone.trajectory.position(mission_step)).tolist())
+    assert len(cache.rows) <= simulator.n_drones + 1
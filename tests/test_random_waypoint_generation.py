@@ -0,0 +1,59 @@
+import json
+import os
+
+import numpy as np
+
+from src.utilities import random_waypoint_generation as rwg
+
+DEPOT = (750, 0)
+MISSION_DATA = {"ndrones": "3", "autonomy_meters": "20000", "edge_area": "1500"}
+
+
+def original_next_target(depot_pos, cur_position, residual_autonomy, edge_area, range_decision, random_generator):
+    """ the step of the generator before the draws were rewritten, with random_generator.choice """
+    to_depot = rwg.euclidean_distance(cur_position, depot_pos)
+    if residual_autonomy < min(range_decision) * 1.44 + to_depot:
+        return depot_pos, max(0, residual_autonomy - to_depot)
+
+    feasible_positions = [d for d in range_decision if d * 1.44 * 2 + to_depot <= residual_autonomy]
+    if len(feasible_positions) == 0:
+        return depot_pos, max(0, residual_autonomy - to_depot)
+
+    d = random_generator.choice(feasible_positions)
+    next_point_x = random_generator.randint(max(0, cur_position[0] - d), min(cur_position[0] + d, edge_area))
+    next_point_y = random_generator.randint(max(0, cur_position[1] - d), min(cur_position[1] + d, edge_area))
+    next_p = (next_point_x, next_point_y)
+    return next_p, residual_autonomy - rwg.euclidean_distance(cur_position, next_p)
+
+
+def tours(seed):
+    return rwg.random_waypoint_tour(3, 2, DEPOT, 20000, 1500, np.random.RandomState(seed))
+
+
+def test_same_tours_as_the_original_draws(monkeypatch):
+    generated = [tours(seed) for seed in range(5)]
+
+    monkeypatch.setattr(rwg, "next_target", original_next_target)
+    assert generated == [tours(seed) for seed in range(5)]
+
+
+def test_pool_writes_the_serial_tours(tmp_path, monkeypatch):
+    def generate(directory, pooled):
+        os.makedirs(directory / "data" / "tours")
+        monkeypatch.chdir(directory)
+        if pooled:
+            rwg.run_seeds([0, 1], 3, 2, 20000, DEPOT, MISSION_DATA, 1500, processes=2)
+        else:
+            for seed in [0, 1]:
+                rwg.run(3, 2, 20000, DEPOT, MISSION_DATA, 1500, seed, plot=False, save=True)
+
+    generate(tmp_path / "serial", False)
+    generate(tmp_path / "pooled", True)
+
+    for seed in [0, 1]:
+        name = "data/tours/RANDOM_missions" + str(seed)
+        with open(tmp_path / "serial" / (name + ".json")) as serial, open(tmp_path / "pooled" / (name + ".json")) as pooled:
+            assert json.load(serial)["drones"] == json.load(pooled)["drones"]
+        with np.load(tmp_path / "serial" / (name + ".npz")) as serial, np.load(tmp_path / "pooled" / (name + ".npz")) as pooled:
+            assert serial.files == pooled.files
+            assert all(np.array_equal(serial[key], pooled[key]) for key in serial.files)
@@ -0,0 +1,18 @@
+import pytest
+
+from src.simulation.replicas import ReplicaEngine
+
+REPLICAS = [("GEO", 10), ("RND", 11), ("QL", 12), ("FEQR", 13)]
+
+
+@pytest.mark.parametrize("medium_channel_error", [False, True])
+def test_replicas_same_as_alone(simulate, make_simulator, summarize, medium_channel_error):
+    expected = [simulate(routing_algorithm, seed=seed, medium_channel_error=medium_channel_error)
+                for routing_algorithm, seed in REPLICAS]
+
+    simulators = [make_simulator(routing_algorithm, seed=seed, medium_channel_error=medium_channel_error)
+                  for routing_algorithm, seed in REPLICAS]
+    ReplicaEngine(simulators).run()
+
+    assert all(simulator.ended for simulator in simulators)
+    assert [summarize(simulator) for simulator in simulators] == expected
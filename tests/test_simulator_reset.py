@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.utilities import config
+
+
+@pytest.fixture
+def rerun(summarize):
+    """ reset the simulator and run it again, the global generators seeded as in a fresh process """
+    def run(simulator, **reset_args):
+        np.random.seed(0)
+        random.seed(0)
+        simulator.reset(**reset_args).run()
+        return summarize(simulator)
+    return run
+
+
+@pytest.mark.parametrize("routing_algorithm, simulator_args", [("GEO", {"seed": 11}),
+                                                               ("QL", {}),
+                                                               ("FEQR", {"seed": 12}),
+                                                               ("RND", {"n_drones": 7})])
+def test_reset_same_as_a_new_simulator(simulate, make_simulator, rerun, routing_algorithm, simulator_args):
+    simulator = make_simulator("GEO")
+    simulator.run()
+
+    expected = simulate(routing_algorithm, **simulator_args)
+    assert rerun(simulator, routing_algorithm=config.RoutingAlgorithm[routing_algorithm], **simulator_args) == expected
+
+
+def test_reset_reuses_the_contact_plan(simulate, make_simulator, rerun, monkeypatch):
+    monkeypatch.setattr(config, "CONTACT_PLAN", True)
+    simulator = make_simulator("GEO")
+    simulator.run()
+    contact_plan = simulator.contact_plan
+
+    assert rerun(simulator, routing_algorithm=config.RoutingAlgorithm.RND) == simulate("RND")
+    assert simulator.contact_plan is contact_plan
@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize("routing_algorithm", ["GEO", "QL"])
+def test_step_and_run_until_same_as_run(simulate, make_simulator, summarize, routing_algorithm):
+    expected = simulate(routing_algorithm)
+
+    simulator = make_simulator(routing_algorithm)
+    assert not simulator.step()
+    assert not simulator.step(499)
+    assert simulator.next_step == 500
+    assert not simulator.run_until(1234)
+    assert not simulator.ended
+    assert simulator.step(10 ** 6)
+    assert simulator.ended and simulator.next_step == simulator.len_simulation
+    assert summarize(simulator) == expected
+
+
+def test_steps_same_as_run(simulate, make_simulator, summarize):
+    expected = simulate("GEO")
+
+    simulator = make_simulator("GEO")
+    yielded = list(simulator.steps(every=600))
+    assert yielded == [600, 1200, 1800, 2000]
+    assert simulator.ended
+    assert summarize(simulator) == expected
+
+
+def test_run_after_some_steps(simulate, make_simulator, summarize):
+    expected = simulate("GEO")
+
+    simulator = make_simulator("GEO")
+    simulator.run_until(700)
+    simulator.run()
+    assert summarize(simulator) == expected
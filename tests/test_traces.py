@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def trace(simulate, tmp_path):
+    """ a trace of the GEO simulation """
+    filename = str(tmp_path / "trace.npz")
+    simulate("GEO", trace_record_path=filename)
+    return filename
+
+
+def test_trace_records_every_step(trace):
+    with np.load(trace) as recorded:
+        assert recorded["positions"].shape == (2001, 10, 2)
+        assert len(recorded["event_steps"]) > 0
+
+
+@pytest.mark.parametrize("routing_algorithm", ["GEO", "RND", "NONE"])
+def test_replay_same_simulation(simulate, trace, routing_algorithm):
+    assert simulate(routing_algorithm, trace_replay_path=trace) == simulate(routing_algorithm)
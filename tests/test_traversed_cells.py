@@ -0,0 +1,21 @@
+from src.utilities.utilities import TraversedCells
+
+
+def test_corner_crossing_is_symmetric():
+    forward = TraversedCells.cells_in_travel(375, 1500, (0, 0), (750, 750))
+    backward = TraversedCells.cells_in_travel(375, 1500, (750, 750), (0, 0))
+
+    assert forward == [(0, 0), (1, 0), (0, 1), (1, 1), (2, 1), (1, 2), (2, 2)]
+    assert set(forward) == set(backward)
+
+
+def test_batch_walk_matches_single_walk():
+    segments = [((0, 0), (750, 750)), ((750, 750), (0, 0)), ((10, 20), (1400, 900)), ((0, 375), (750, 0)),
+                ((100, 100), (120, 130))]
+    starts, ends = zip(*segments)
+
+    segment_ids, cells = TraversedCells.cells_in_travels(375, starts, ends)
+
+    for i, (start, end) in enumerate(segments):
+        assert [tuple(cell) for cell in cells[segment_ids == i].tolist()] == \
+            TraversedCells.cells_in_travel(375, 1500, start, end)